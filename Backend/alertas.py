@@ -0,0 +1,117 @@
+#Propósito: Alertas de stock bajo y agotado (alertas_stock) repartidas a los dashboards por Server-Sent Events.
+
+from db import supabase
+import json
+import os
+import queue
+import threading
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+ALERTAS_INTERVALO = float(os.environ.get('ALERTAS_INTERVALO', 2))
+ALERTAS_LATIDO = float(os.environ.get('ALERTAS_LATIDO', 15))
+ALERTAS_LOTE = 500
+
+
+def leer_alertas(desde_id=None, limite=ALERTAS_LOTE):
+    # Transiciones con id mayor a desde_id, en orden; sin desde_id, las más recientes
+    query = supabase.table('alertas_stock').select('*')
+    if desde_id is not None:
+        return query.gt('id', desde_id).order('id').limit(limite).execute().data
+    return list(reversed(query.order('id', desc=True).limit(limite).execute().data))
+
+
+def evento_sse(alerta):
+    # El nombre del evento es el estado nuevo: 'bajo', 'agotado' o 'normal' (repuesto)
+    return f"id: {alerta['id']}\nevent: {alerta['estado']}\ndata: {json.dumps(alerta, ensure_ascii=False, default=str)}\n\n"
+
+
+class DifusorAlertas:
+    # Un hilo por proceso consulta alertas_stock (id > último visto) y reparte cada alerta
+    # a las conexiones SSE abiertas: una consulta cada intervalo sin importar cuántos dashboards haya
+
+    def __init__(self, intervalo=ALERTAS_INTERVALO):
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._suscriptores = set()
+        self._ultimo_id = None
+        self._hilo = None
+        self._pid_hilo = None
+
+    def suscribir(self):
+        cola = queue.Queue(maxsize=1000)
+        self._asegurar_hilo()
+        with self._lock:
+            self._suscriptores.add(cola)
+        return cola
+
+    def cancelar(self, cola):
+        with self._lock:
+            self._suscriptores.discard(cola)
+
+    def _asegurar_hilo(self):
+        # Creado al primer dashboard conectado, uno por proceso de gunicorn
+        pid = os.getpid()
+        if self._hilo is None or self._pid_hilo != pid or not self._hilo.is_alive():
+            with self._lock:
+                if self._hilo is None or self._pid_hilo != pid or not self._hilo.is_alive():
+                    if self._pid_hilo != pid:
+                        self._suscriptores = set()
+                        self._ultimo_id = None
+                    self._hilo = threading.Thread(target=self._bucle, name='alertas', daemon=True)
+                    self._pid_hilo = pid
+                    self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            try:
+                with self._lock:
+                    suscriptores = list(self._suscriptores)
+                if not suscriptores:
+                    # Sin dashboards conectados no se consulta; al volver se parte de la última alerta
+                    self._ultimo_id = None
+                elif self._ultimo_id is None:
+                    recientes = leer_alertas(limite=1)
+                    self._ultimo_id = recientes[-1]['id'] if recientes else 0
+                else:
+                    for alerta in leer_alertas(self._ultimo_id):
+                        self._ultimo_id = alerta['id']
+                        self._repartir(suscriptores, alerta)
+            except Exception as e:
+                log.error("Error al consultar alertas de stock: %s", e)
+            time.sleep(self.intervalo)
+
+    def _repartir(self, suscriptores, alerta):
+        for cola in suscriptores:
+            try:
+                cola.put_nowait(alerta)
+            except queue.Full:
+                # Un cliente que no lee no frena a los demás; al reconectar recupera con Last-Event-ID
+                pass
+
+    def flujo(self, ultimo_evento=None, latido=ALERTAS_LATIDO):
+        # Generador de la respuesta text/event-stream; con Last-Event-ID primero envía lo que se perdió
+        cola = self.suscribir()
+        try:
+            yield f"retry: {int(self.intervalo * 1000) + 1000}\n\n"
+            enviado = 0
+            if ultimo_evento is not None:
+                for alerta in leer_alertas(ultimo_evento):
+                    enviado = alerta['id']
+                    yield evento_sse(alerta)
+            while True:
+                try:
+                    alerta = cola.get(timeout=latido)
+                except queue.Empty:
+                    # Comentario SSE para que proxies y balanceadores no cierren la conexión
+                    yield ": latido\n\n"
+                    continue
+                if alerta['id'] > enviado:
+                    yield evento_sse(alerta)
+        finally:
+            self.cancelar(cola)
+
+
+difusor_alertas = DifusorAlertas()
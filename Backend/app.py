@@ -1,6 +1,11 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import os
+import registro
+
+# Logging JSON en segundo plano antes de importar los blueprints (ver registro.py)
+registro.configurar()
+
 from productos import productos_bp
 from usuarios import usuarios_bp
 from carrito import carrito_bp
@@ -8,9 +13,17 @@ from inventario import inventario_bp
 from ventas import ventas_bp
 from pagos import pagos_bp
 from gateway import gateway_bp
+import auth
+import campos
+import compresion
+import metricas
+import serializacion
 
 app = Flask(__name__)
 
+# orjson para jsonify y request.get_json() (JSON_PROVEEDOR=estandar usa el módulo json)
+serializacion.configurar(app)
+
 # Configurar CORS para permitir solicitudes desde dominios específicos
 allowed_origins = [
     os.environ.get('FRONTEND_URL', 'https://karma-front.vercel.app'),  # Frontend desplegado
@@ -46,6 +59,18 @@ def after_request(response):
         response.headers['Access-Control-Allow-Credentials'] = 'true'
     return response
 
+# Latencia y llamadas a Supabase por endpoint, expuestas en /metrics (antes que auth para medir los 401)
+metricas.configurar(app)
+
+# Tokens JWT: verificados en memoria antes de cada solicitud a /api
+auth.configurar(app)
+
+# ?fields= con campos fuera de la lista blanca responde 400
+campos.configurar(app)
+
+# Brotli/gzip según Accept-Encoding y 304 para los listados que no cambiaron (ETag fuerte)
+compresion.configurar(app)
+
 # Registrar los blueprints - orden lógico del flujo de compra
 app.register_blueprint(usuarios_bp, url_prefix='/api')     # Autenticación primero
 app.register_blueprint(productos_bp, url_prefix='/api')    # Catálogo de productos
@@ -0,0 +1,147 @@
+#Propósito: Tokens de acceso firmados (JWT) verificados en memoria en cada solicitud a /api y registro diferido de last_login.
+
+from flask import request, g, jsonify
+from flask_jwt_extended import JWTManager, create_access_token, verify_jwt_in_request, get_jwt
+from db import supabase, en_paralelo
+import atexit
+import datetime
+import os
+import secrets
+import threading
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+JWT_HORAS = float(os.environ.get('JWT_HORAS', 12))
+# Por defecto false mientras el frontend no envíe Authorization: Bearer en todas sus solicitudes
+AUTH_REQUERIDA = os.environ.get('AUTH_REQUERIDA', 'false').lower() == 'true'
+LAST_LOGIN_INTERVALO = float(os.environ.get('LAST_LOGIN_INTERVALO', 30))
+
+# Endpoints accesibles sin token
+ENDPOINTS_PUBLICOS = {'usuarios.login', 'usuarios.register', 'gateway.gateway_index'}
+
+# Endpoints que aceptan el token en ?token= (EventSource no permite enviar encabezados)
+ENDPOINTS_TOKEN_EN_URL = {'inventario.stream_alertas'}
+
+
+def configurar(app):
+    secreto = os.environ.get('JWT_SECRET_KEY') or os.environ.get('SECRET_KEY')
+    if not secreto:
+        # Cada proceso tendría su propia clave: los tokens no sirven entre workers ni tras reiniciar
+        log.warning("JWT_SECRET_KEY no está configurada, se usa una clave temporal")
+        secreto = secrets.token_hex(32)
+    app.config['JWT_SECRET_KEY'] = secreto
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = datetime.timedelta(hours=JWT_HORAS)
+    app.config['JWT_TOKEN_LOCATION'] = ['headers', 'query_string']
+    app.config['JWT_QUERY_STRING_NAME'] = 'token'
+
+    jwt = JWTManager(app)
+
+    # Mismo formato de error que el resto de la API
+    @jwt.unauthorized_loader
+    def sin_token(motivo):
+        return jsonify({"error": "Se requiere autenticación"}), 401
+
+    @jwt.invalid_token_loader
+    def token_invalido(motivo):
+        return jsonify({"error": "Token inválido"}), 401
+
+    @jwt.expired_token_loader
+    def token_expirado(encabezado, datos):
+        return jsonify({"error": "Token expirado"}), 401
+
+    app.before_request(verificar_solicitud)
+
+
+def crear_token(usuario):
+    # El token lleva id, rol y datos de perfil: verificarlo no requiere consultar usuarios
+    return create_access_token(
+        identity=str(usuario['id']),
+        additional_claims={
+            'role': usuario.get('role'),
+            'nombre': usuario.get('nombre'),
+            'correo': usuario.get('correo'),
+            'last_login': datetime.datetime.now().isoformat()
+        }
+    )
+
+
+def verificar_solicitud():
+    # Solo firma y expiración, en memoria: ninguna consulta a Supabase por solicitud
+    g.usuario = None
+    if request.method == 'OPTIONS' or not (request.path == '/api' or request.path.startswith('/api/')):
+        return None
+    if request.endpoint in ENDPOINTS_PUBLICOS:
+        return None
+    ubicaciones = ['headers', 'query_string'] if request.endpoint in ENDPOINTS_TOKEN_EN_URL else ['headers']
+    # Sin AUTH_REQUERIDA (modo de transición) se acepta la solicitud sin token, pero un token
+    # alterado o expirado responde 401 igual: no se trata como anónimo
+    verify_jwt_in_request(optional=not AUTH_REQUERIDA, locations=ubicaciones)
+    datos = get_jwt()
+    if datos:
+        g.usuario = {
+            'id': int(datos['sub']),
+            'role': datos.get('role'),
+            'nombre': datos.get('nombre'),
+            'correo': datos.get('correo'),
+            'last_login': datos.get('last_login')
+        }
+    return None
+
+
+class RegistroUltimoLogin:
+    # Los logins se acumulan en memoria ({usuario_id: fecha}) y un hilo escribe cada intervalo
+    # un único update por usuario, sin que el login espere a Supabase
+
+    def __init__(self, intervalo=LAST_LOGIN_INTERVALO):
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._pendientes = {}
+        self._hilo = None
+        self._pid_hilo = None
+        self._atexit_registrado = False
+
+    def registrar(self, usuario_id, fecha=None):
+        with self._lock:
+            self._pendientes[usuario_id] = fecha or datetime.datetime.now().isoformat()
+        self._asegurar_hilo()
+
+    def _asegurar_hilo(self):
+        pid = os.getpid()
+        if self._hilo is None or self._pid_hilo != pid or not self._hilo.is_alive():
+            with self._lock:
+                if self._hilo is None or self._pid_hilo != pid or not self._hilo.is_alive():
+                    self._hilo = threading.Thread(target=self._bucle, name='last_login', daemon=True)
+                    self._pid_hilo = pid
+                    self._hilo.start()
+                    if not self._atexit_registrado:
+                        atexit.register(self.escribir)
+                        self._atexit_registrado = True
+
+    def _bucle(self):
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self.escribir()
+            except Exception as e:
+                log.error("Error al actualizar last_login: %s", e)
+
+    def escribir(self):
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+        if not pendientes:
+            return 0
+        try:
+            en_paralelo(*[supabase.table('usuarios').update({'last_login': fecha}).eq('id', usuario_id)
+                          for usuario_id, fecha in pendientes.items()])
+        except Exception:
+            # Se reintentan en el próximo intervalo salvo que haya un login más reciente
+            with self._lock:
+                for usuario_id, fecha in pendientes.items():
+                    self._pendientes.setdefault(usuario_id, fecha)
+            raise
+        return len(pendientes)
+
+
+registro_ultimo_login = RegistroUltimoLogin()
@@ -0,0 +1,126 @@
+#Propósito: Benchmark de throughput por ruta contra el sustituto en memoria de Supabase (sin red ni proyecto real).
+
+import os
+
+# Solo errores: los avisos de RPC no instaladas saldrían una vez por escenario
+os.environ.setdefault('LOG_NIVEL', 'ERROR')
+
+import click
+import db
+import random
+import threading
+import time
+from app import app
+from auth import crear_token
+from catalogo import catalogo
+from postgrest_memoria import PostgrestMemoria, ajustar_stock
+
+CATEGORIAS = ('anillos', 'collares', 'pulseras', 'aretes', 'relojes')
+
+
+def datos_iniciales(productos, ventas=1000):
+    # Catálogo de `productos` filas con stock de sobra para no agotar nada durante la medición
+    return {
+        'productos': [{"id": i, "nombre": f"Producto {i}", "precio": float(100 + i % 900), "stock": 10 ** 9,
+                       "sku": f"ANRO{i:06d}", "codigo_barras": f"75{i:010d}", "categoria": CATEGORIAS[i % len(CATEGORIAS)],
+                       "descuento": 0, "descripcion": "Plata 925"} for i in range(1, productos + 1)],
+        'ventas': [{"id": i, "fecha": f"2026-10-{1 + i % 28:02d}T12:00:00", "total": 500.0, "subtotal": 500.0,
+                    "descuento": 0, "usuario_id": 1} for i in range(1, ventas + 1)],
+        'pagos': [{"id": i, "venta_id": i, "metodo_pago": "efectivo", "monto": 500.0, "estado": "completado",
+                   "fecha": f"2026-10-{1 + i % 28:02d}T12:00:00"} for i in range(1, ventas + 1)],
+        'detalles_venta': [], 'carrito': [], 'historial_inventario': [], 'usuarios': [], 'metodos_pago': [],
+    }
+
+
+def rutas(productos, items):
+    # (nombre, función que arma (método, url, cuerpo) con ids aleatorios del catálogo)
+    azar = lambda: random.randint(1, productos)
+    ticket = lambda: [{"producto_id": azar(), "cantidad": 1, "precio": 100.0} for _ in range(items)]
+    return [
+        ('GET /api/productos', lambda: ('GET', '/api/productos', None)),
+        ('GET /api/productos/<id>', lambda: ('GET', f'/api/productos/{azar()}', None)),
+        ('GET /api/productos/codigo/<sku>', lambda: ('GET', f'/api/productos/codigo/ANRO{azar():06d}', None)),
+        ('GET /api/inventario', lambda: ('GET', '/api/inventario', None)),
+        ('GET /api/inventario?incluir_productos=false', lambda: ('GET', '/api/inventario?incluir_productos=false', None)),
+        ('GET /api/inventario/stock-bajo', lambda: ('GET', '/api/inventario/stock-bajo', None)),
+        ('GET /api/ventas', lambda: ('GET', '/api/ventas', None)),
+        ('POST /api/carrito', lambda: ('POST', '/api/carrito', {"producto_id": azar(), "cantidad": 1, "vendedor_id": 1})),
+        ('GET /api/carrito/total', lambda: ('GET', '/api/carrito/total?vendedor_id=1', None)),
+        (f'POST /api/ventas ({items} items)', lambda: ('POST', '/api/ventas', {"items": ticket(), "actualizar_inventario": True})),
+        (f'POST /api/inventario/ajuste ({items} items)',
+         lambda: ('POST', '/api/inventario/ajuste', [{"producto_id": azar(), "cantidad": 1} for _ in range(items)])),
+    ]
+
+
+def percentil(tiempos, p):
+    return tiempos[min(len(tiempos) - 1, int(len(tiempos) * p))] * 1000 if tiempos else 0
+
+
+def medir_ruta(solicitud, token, duracion, concurrencia):
+    # Cada hilo repite la solicitud hasta agotar la duración; devuelve (rps, p50 ms, p99 ms, errores)
+    tiempos = []
+    errores = []
+    lock = threading.Lock()
+    fin = time.monotonic() + duracion
+    encabezados = {'Authorization': f'Bearer {token}'}
+
+    def cliente():
+        client = app.test_client()
+        while time.monotonic() < fin:
+            metodo, url, cuerpo = solicitud()
+            inicio = time.perf_counter()
+            respuesta = client.open(url, method=metodo, json=cuerpo, headers=encabezados)
+            transcurrido = time.perf_counter() - inicio
+            with lock:
+                tiempos.append(transcurrido)
+                if respuesta.status_code >= 400:
+                    errores.append(respuesta.status_code)
+
+    inicio = time.monotonic()
+    hilos = [threading.Thread(target=cliente) for _ in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    total = time.monotonic() - inicio
+    tiempos.sort()
+    return len(tiempos) / total, percentil(tiempos, 0.50), percentil(tiempos, 0.99), len(errores)
+
+
+def _lista(valor):
+    return [int(parte) for parte in valor.split(',') if parte]
+
+
+@click.command()
+@click.option('--productos', default='100,1000,10000,100000', help='Tamaños de catálogo, separados por comas')
+@click.option('--items', default='1,10,50,200', help='Items por ticket en ventas y ajustes, separados por comas')
+@click.option('--latencia', default=0.005, help='Segundos añadidos a cada llamada a Supabase')
+@click.option('--duracion', default=2.0, help='Segundos de medición por ruta')
+@click.option('--concurrencia', default=8, help='Solicitudes simultáneas')
+@click.option('--ruta', 'filtro', default='', help='Solo las rutas que contengan este texto')
+def benchmark(productos, items, latencia, duracion, concurrencia, filtro):
+    # Uso: python benchmark.py --productos 100,100000 --items 1,200 --latencia 0.01
+    # Sin las RPC de Backend/*.sql: mide el camino de respaldo en Python (el peor caso);
+    # solo ajustar_stock, que el respaldo de las ventas necesita para descontar stock
+    with app.app_context():
+        token = crear_token({"id": 1, "nombre": "Benchmark", "correo": "benchmark@karma.com", "role": "admin"})
+    click.echo(f"Latencia por llamada: {latencia * 1000:.1f} ms, concurrencia {concurrencia}, {duracion:g} s por ruta")
+    click.echo(f"{'productos':>9} {'ruta':<42} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'errores':>7}")
+    for cantidad in _lista(productos):
+        memoria = PostgrestMemoria(datos_iniciales(cantidad), latencia=latencia, rpcs={'ajustar_stock': ajustar_stock})
+        db.configurar_cliente(memoria.cliente())
+        catalogo.invalidar()
+        medidas = set()
+        for tamano in _lista(items):
+            for nombre, solicitud in rutas(cantidad, tamano):
+                # Las rutas sin items se miden una sola vez por catálogo
+                if nombre in medidas or filtro not in nombre:
+                    continue
+                medidas.add(nombre)
+                rps, p50, p99, errores = medir_ruta(solicitud, token, duracion, concurrencia)
+                click.echo(f"{cantidad:>9} {nombre:<42} {rps:>8.1f} {p50:>8.1f} {p99:>8.1f} {errores:>7}")
+    db.configurar_cliente(None)
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,61 @@
+#Propósito: Benchmark de CPU del proveedor JSON (estándar contra orjson) con las respuestas más grandes de la API.
+
+import os
+
+os.environ.setdefault('LOG_NIVEL', 'ERROR')
+
+import click
+import db
+import time
+from app import app
+from auth import crear_token
+from benchmark import datos_iniciales
+from postgrest_memoria import PostgrestMemoria
+from serializacion import PROVEEDORES
+
+
+def _cpu_ms(funcion, repeticiones):
+    inicio = time.process_time()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.process_time() - inicio) * 1000 / repeticiones
+
+
+@click.command()
+@click.option('--productos', default=10000, help='Productos del catálogo (GET /api/productos/etiquetas devuelve todos)')
+@click.option('--ventas', default=500, help='Ventas por página de GET /api/ventas (cada una con sus pagos)')
+@click.option('--pagos', default=3, help='Pagos por venta (pagos mixtos)')
+@click.option('--repeticiones', default=20, help='Serializaciones medidas por proveedor')
+def benchmark_json(productos, ventas, pagos, repeticiones):
+    # Uso: python benchmark_json.py --productos 10000 --ventas 500
+    datos = datos_iniciales(productos, ventas=ventas)
+    datos['pagos'] = [{"id": i * pagos + j, "venta_id": i, "metodo_pago": ("efectivo", "tarjeta", "transferencia")[j % 3],
+                       "monto": 500.0 / pagos, "estado": "completado", "referencia": f"REF-{i}-{j}",
+                       "fecha": "2026-10-18T12:00:00", "datos_adicionales": {"methodId": "tarjeta", "amount": 500.0 / pagos}}
+                      for i in range(1, ventas + 1) for j in range(pagos)]
+    db.configurar_cliente(PostgrestMemoria(datos).cliente())
+    with app.app_context():
+        token = crear_token({"id": 1, "nombre": "Benchmark", "correo": "benchmark@karma.com", "role": "admin"})
+    client = app.test_client()
+    encabezados = {'Authorization': f'Bearer {token}'}
+    respuestas = {
+        f'GET /api/ventas?limit={ventas}': client.get(f'/api/ventas?limit={ventas}', headers=encabezados).get_json(),
+        'GET /api/productos/etiquetas': client.get('/api/productos/etiquetas', headers=encabezados).get_json(),
+    }
+    db.configurar_cliente(None)
+
+    click.echo(f"{'respuesta':<32} {'proveedor':<10} {'KB':>8} {'serializar ms':>14} {'leer ms':>9} {'CPU ahorrada':>13}")
+    for nombre, contenido in respuestas.items():
+        base = None
+        for clave, clase in PROVEEDORES.items():
+            proveedor = clase(app)
+            cuerpo = proveedor.response(contenido).get_data()
+            serializar = _cpu_ms(lambda: proveedor.response(contenido).get_data(), repeticiones)
+            leer = _cpu_ms(lambda: proveedor.loads(cuerpo), repeticiones)
+            base = base or serializar + leer
+            ahorro = (1 - (serializar + leer) / base) * 100
+            click.echo(f"{nombre:<32} {clave:<10} {len(cuerpo) / 1024:>8.0f} {serializar:>14.2f} {leer:>9.2f} {ahorro:>12.0f}%")
+
+
+if __name__ == '__main__':
+    benchmark_json()
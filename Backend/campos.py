@@ -0,0 +1,117 @@
+#Propósito: Campos parciales (?fields=) validados contra una lista blanca y traducidos al select de Supabase.
+
+from flask import request, jsonify
+
+# Columnas que un cliente puede pedir por tabla (la contraseña de usuarios nunca está)
+COLUMNAS = {
+    'productos': ('id', 'nombre', 'stock', 'precio', 'categoria', 'color', 'codigo_barras', 'sku', 'descuento', 'umbral_stock'),
+    'ventas': ('id', 'cliente_id', 'usuario_id', 'fecha', 'total', 'subtotal', 'descuento', 'estado', 'fecha_pago'),
+    'pagos': ('id', 'venta_id', 'metodo_pago', 'monto', 'fecha', 'referencia', 'estado', 'datos_adicionales', 'usuario_id'),
+    'carrito': ('id', 'producto_id', 'cantidad', 'vendedor_id', 'cliente_id'),
+    'usuarios': ('id', 'nombre', 'correo', 'role', 'last_login'),
+}
+
+# Tablas relacionadas que se pueden incrustar: ?fields=cantidad,productos.nombre -> cantidad, productos(nombre)
+INCRUSTABLES = {'carrito': ('productos',)}
+
+
+class CamposInvalidos(ValueError):
+    def __init__(self, mensaje, permitidos):
+        super().__init__(mensaje)
+        self.permitidos = permitidos
+
+
+class Proyeccion:
+    # Campos pedidos por el cliente: columnas de la tabla, campos que calcula la ruta
+    # (derivadas) y columnas de cada tabla incrustada (None = todas)
+
+    def __init__(self, tabla, texto, derivadas=()):
+        permitidos = list(COLUMNAS[tabla]) + [c for c in derivadas if c not in COLUMNAS[tabla]]
+        incrustables = INCRUSTABLES.get(tabla, ())
+        for relacionada in incrustables:
+            permitidos += [relacionada] + [f"{relacionada}.{c}" for c in COLUMNAS[relacionada]]
+
+        self.columnas = []
+        self.derivadas = []
+        self.incrustadas = {}
+        invalidos = []
+        for campo in (c.strip() for c in texto.split(',')):
+            if not campo:
+                continue
+            relacionada, _, columna = campo.rpartition('.')
+            if campo not in permitidos:
+                invalidos.append(campo)
+            elif relacionada:
+                columnas = self.incrustadas.setdefault(relacionada, [])
+                if columnas is not None and columna not in columnas:
+                    columnas.append(columna)
+            elif campo in incrustables:
+                self.incrustadas[campo] = None
+            elif campo in derivadas:
+                if campo not in self.derivadas:
+                    self.derivadas.append(campo)
+            elif campo not in self.columnas:
+                self.columnas.append(campo)
+
+        if invalidos:
+            raise CamposInvalidos(f"Campos no permitidos: {', '.join(invalidos)}", permitidos)
+        if not (self.columnas or self.derivadas or self.incrustadas):
+            raise CamposInvalidos("fields no puede estar vacío", permitidos)
+
+    @property
+    def clave(self):
+        # Forma normalizada (para distinguir la ETag de cada proyección)
+        incrustadas = [f"{t}({','.join(c) if c is not None else '*'})" for t, c in sorted(self.incrustadas.items())]
+        return ','.join(sorted(self.columnas) + sorted(self.derivadas) + incrustadas)
+
+    def pide(self, *campos):
+        return any(c in self.columnas or c in self.derivadas or c in self.incrustadas for c in campos)
+
+    def select(self, *requeridas, **incrustadas_requeridas):
+        # Select de PostgREST con lo pedido más lo que la ruta necesita para calcular la respuesta;
+        # recortar() quita después lo que el cliente no pidió
+        partes = list(dict.fromkeys(self.columnas + list(requeridas)))
+        for relacionada in dict.fromkeys(list(self.incrustadas) + list(incrustadas_requeridas)):
+            columnas = self.incrustadas.get(relacionada, [])
+            if columnas is None:
+                partes.append(f"{relacionada}(*)")
+            else:
+                columnas = list(dict.fromkeys(columnas + list(incrustadas_requeridas.get(relacionada, ()))))
+                partes.append(f"{relacionada}({', '.join(columnas)})")
+        return ', '.join(partes) or 'id'
+
+    def recortar(self, datos):
+        # Acepta una fila o una lista de filas
+        if isinstance(datos, list):
+            return [self.recortar(fila) for fila in datos]
+        fila = {c: datos[c] for c in self.columnas + self.derivadas if c in datos}
+        for relacionada, columnas in self.incrustadas.items():
+            valor = datos.get(relacionada)
+            if columnas is None or valor is None:
+                fila[relacionada] = valor
+            elif isinstance(valor, list):
+                fila[relacionada] = [{c: v.get(c) for c in columnas} for v in valor]
+            else:
+                fila[relacionada] = {c: valor.get(c) for c in columnas}
+        return fila
+
+
+def leer_campos(tabla, derivadas=()):
+    # None si la solicitud no trae ?fields= (respuesta completa, como hasta ahora)
+    texto = request.args.get('fields')
+    if texto is None:
+        return None
+    return Proyeccion(tabla, texto, derivadas)
+
+
+def recortar(campos, datos):
+    return campos.recortar(datos) if campos is not None else datos
+
+
+def respuesta_invalida(error):
+    return jsonify({"error": str(error), "permitidos": error.permitidos}), 400
+
+
+def configurar(app):
+    # Las rutas llaman a leer_campos() antes de su try/except general: el 400 sale de aquí
+    app.register_error_handler(CamposInvalidos, respuesta_invalida)
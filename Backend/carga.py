@@ -0,0 +1,269 @@
+#Propósito: Prueba de carga del flujo de caja (login, escaneo, total, venta y pago dividido) con verificación de stock y carritos.
+
+import os
+
+# Solo errores: los avisos de RPC no instaladas saldrían una vez por ejecución
+os.environ.setdefault('LOG_NIVEL', 'ERROR')
+
+import click
+import collections
+import db
+import httpx
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app import app
+from auth import registro_ultimo_login
+from benchmark import datos_iniciales, percentil
+from catalogo import catalogo
+from contrasenas import hashear_local
+from historial import escritor_historial
+from postgrest_memoria import PostgrestMemoria, RPCS_SQL, ajustar_stock
+
+PASOS = ('login', 'escanear', 'carrito', 'total', 'venta', 'pago')
+
+
+class _ClienteLocal:
+    # app.app en el mismo proceso (cliente de pruebas de Flask), un cliente por hilo
+
+    def __init__(self):
+        self._client = app.test_client()
+
+    def solicitud(self, metodo, ruta, cuerpo=None, token=None):
+        encabezados = {'Authorization': f'Bearer {token}'} if token else {}
+        respuesta = self._client.open(ruta, method=metodo, json=cuerpo, headers=encabezados)
+        return respuesta.status_code, respuesta.get_json(silent=True)
+
+
+class _ClienteRemoto:
+    # Backend levantado aparte (gunicorn o flask run), p. ej. http://localhost:5000
+
+    def __init__(self, url):
+        self._client = httpx.Client(base_url=url, timeout=60)
+
+    def solicitud(self, metodo, ruta, cuerpo=None, token=None):
+        encabezados = {'Authorization': f'Bearer {token}'} if token else {}
+        respuesta = self._client.request(metodo, ruta, json=cuerpo, headers=encabezados)
+        try:
+            return respuesta.status_code, respuesta.json()
+        except ValueError:
+            return respuesta.status_code, None
+
+
+class Resultados:
+    # Tiempos y errores por paso, ventas confirmadas y líneas de carrito duplicadas
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tiempos = collections.defaultdict(list)
+        self.errores = collections.defaultdict(collections.Counter)
+        self.vendido = collections.Counter()
+        self.duplicados = []
+        self.incompletos = 0
+
+    def medir(self, paso, cliente, metodo, ruta, cuerpo=None, token=None, esperado=(200, 201)):
+        inicio = time.perf_counter()
+        try:
+            estado, datos = cliente.solicitud(metodo, ruta, cuerpo, token)
+        except Exception as e:
+            estado, datos = type(e).__name__, None
+        with self._lock:
+            self.tiempos[paso].append(time.perf_counter() - inicio)
+            if estado not in esperado:
+                self.errores[paso][estado] += 1
+                return None
+        return datos
+
+    def flujo(self, segundos, vendido):
+        # La venta ya descontó stock aunque el pago haya fallado; solo los flujos completos cuentan en el tiempo
+        with self._lock:
+            if segundos is not None:
+                self.tiempos['flujo completo'].append(segundos)
+            self.vendido.update(vendido)
+
+    def carrito(self, duplicados, incompleto):
+        with self._lock:
+            self.duplicados.extend(duplicados)
+            self.incompletos += incompleto
+
+
+def venta(clientes, resultados, cajero, productos, items, repetidos, azar):
+    # Un ticket completo con los clientes del cajero (uno por escaneo simultáneo); True si llegó hasta el pago
+    cliente = clientes[0]
+    inicio = time.perf_counter()
+    token = (resultados.medir('login', cliente, 'POST', '/api/auth/login',
+                              {"correo": cajero['correo'], "password": cajero['password']}) or {}).get('usuario', {}).get('token')
+    if not token:
+        return False
+
+    # Escaneos: con `repetidos` de probabilidad se vuelve a escanear un producto del ticket (doble lectura)
+    escaneos = []
+    for _ in range(items):
+        escaneos.append(azar.choice(escaneos) if escaneos and azar.random() < repetidos else azar.choice(productos))
+
+    def escanear(propio, grupo):
+        for producto in grupo:
+            resultados.medir('escanear', propio, 'POST', '/api/carrito',
+                             {"producto_id": producto['id'], "cantidad": 1, "vendedor_id": cajero['vendedor_id']}, token)
+    if len(clientes) > 1:
+        with ThreadPoolExecutor(len(clientes)) as ejecutor:
+            list(ejecutor.map(escanear, clientes, [escaneos[i::len(clientes)] for i in range(len(clientes))]))
+    else:
+        escanear(cliente, escaneos)
+
+    # La tablet muestra el carrito: cada producto debe aparecer en una sola línea
+    carrito = resultados.medir('carrito', cliente, 'GET', f"/api/carrito?vendedor_id={cajero['vendedor_id']}", token=token) or {}
+    lineas = collections.Counter(linea.get('producto_id') for linea in carrito.get('items', []))
+    unidades = sum(int(linea.get('cantidad') or 0) for linea in carrito.get('items', []))
+    resultados.carrito([(cajero['vendedor_id'], p, n) for p, n in lineas.items() if n > 1], int(unidades != len(escaneos)))
+    resultados.medir('total', cliente, 'GET', f"/api/carrito/total?vendedor_id={cajero['vendedor_id']}", token=token)
+
+    # Venta con lo escaneado (como Pagos.jsx) y luego el pago dividido en efectivo y tarjeta
+    cantidades = collections.Counter(producto['id'] for producto in escaneos)
+    precios = {producto['id']: producto['precio'] for producto in escaneos}
+    total = round(sum(precios[p] * c for p, c in cantidades.items()), 2)
+    creada = resultados.medir('venta', cliente, 'POST', '/api/ventas', {
+        "items": [{"producto_id": p, "cantidad": c, "precio": precios[p]} for p, c in cantidades.items()],
+        "total": total, "subtotal": total, "usuario_id": cajero['usuario_id'],
+        "metodoPago": "mixto", "detallesPago": {"mixedPayments": []},
+        "actualizar_inventario": True, "vaciar_carrito": True
+    }, token)
+    if not creada:
+        return False
+    efectivo = round(total / 2, 2)
+    pagado = resultados.medir('pago', cliente, 'POST', '/api/pagos/split', {
+        "venta_id": creada['venta']['id'],
+        "pagos": [{"metodo_pago": "efectivo", "monto": efectivo}, {"metodo_pago": "tarjeta", "monto": round(total - efectivo, 2)}]
+    }, token, esperado=(201,))
+    resultados.flujo(time.perf_counter() - inicio if pagado is not None else None, {p['id']: p['cantidad'] for p in creada.get('productos', [])})
+    return pagado is not None
+
+
+def leer_stock(cliente, token, productos):
+    stock = {}
+    for producto in productos:
+        estado, datos = cliente.solicitud('GET', f"/api/inventario/{producto['id']}", token=token)
+        if estado == 200:
+            stock[producto['id']] = datos['producto']['stock']
+    return stock
+
+
+def verificar(stock_inicial, stock_final, resultados):
+    # Sobreventa: se vendieron más unidades de las que había; inconsistente: el stock no bajó lo vendido
+    problemas = []
+    for producto_id, inicial in stock_inicial.items():
+        vendido = resultados.vendido.get(producto_id, 0)
+        final = stock_final.get(producto_id)
+        if vendido > inicial:
+            problemas.append(f"Sobreventa: producto {producto_id} vendió {vendido} con stock inicial {inicial} (final {final})")
+        elif final != inicial - vendido:
+            problemas.append(f"Stock inconsistente: producto {producto_id} inicial {inicial} - vendido {vendido} != final {final}")
+    for vendedor_id, producto_id, lineas in resultados.duplicados:
+        problemas.append(f"Carrito duplicado: vendedor {vendedor_id} tiene {lineas} líneas del producto {producto_id}")
+    return problemas
+
+
+def _preparar_local(cajeros, catalogo_productos, activos, stock, latencia, rpcs=True):
+    # Sustituto en memoria: catálogo, `activos` productos con poco stock y un usuario por cajero.
+    # Con rpcs registrar_venta y agregar_carrito se emulan como en los .sql (lo que se despliega);
+    # sin ellas queda ajustar_stock, que el respaldo de las ventas necesita para descontar stock
+    datos = datos_iniciales(catalogo_productos)
+    for producto in datos['productos'][:activos]:
+        producto['stock'] = stock
+    contrasena = hashear_local('carga')
+    datos['usuarios'] = [{"id": i, "nombre": f"Cajero {i}", "correo": f"cajero{i}@karma.com", "role": "cajero",
+                          "contraseña": contrasena} for i in range(1, cajeros + 1)]
+    datos['usuarios'].append({"id": cajeros + 1, "nombre": "Supervisor", "correo": "supervisor@karma.com",
+                              "role": "admin", "contraseña": contrasena})
+    db.configurar_cliente(PostgrestMemoria(datos, latencia=latencia, rpcs=RPCS_SQL if rpcs else {'ajustar_stock': ajustar_stock}).cliente())
+    catalogo.invalidar()
+    return [{"correo": f"cajero{i}@karma.com", "password": 'carga', "usuario_id": i, "vendedor_id": i}
+            for i in range(1, cajeros + 1)], {"correo": "supervisor@karma.com", "password": 'carga'}
+
+
+@click.command()
+@click.option('--url', default=None, help='Backend en marcha (p. ej. http://localhost:5000); sin URL se usa app.app con Supabase en memoria')
+@click.option('--correo', default=None, help='Con --url: usuario con el que inician sesión todos los cajeros')
+@click.option('--password', default=None, help='Con --url: contraseña del usuario')
+@click.option('--cajeros', default=20, help='Cajeros (tablets) simultáneos')
+@click.option('--ventas', default=10, help='Ventas por cajero')
+@click.option('--items', default=5, help='Escaneos por ticket')
+@click.option('--activos', default=20, help='Productos distintos que se venden (los más vendidos del sábado)')
+@click.option('--stock', default=50, help='Sin --url: stock inicial de cada producto activo')
+@click.option('--repetidos', default=0.2, help='Probabilidad de volver a escanear un producto del ticket')
+@click.option('--escaneos-paralelos', default=2, help='Escaneos del mismo ticket enviados a la vez (lector que repite)')
+@click.option('--latencia', default=0.005, help='Sin --url: segundos añadidos a cada llamada a Supabase')
+@click.option('--semilla', default=None, type=int, help='Semilla aleatoria para repetir exactamente la misma carga')
+@click.option('--sin-rpc', is_flag=True, help='Sin --url: no emular registrar_venta/agregar_carrito (solo ajustar_stock) y probar los caminos de respaldo en Python')
+def carga(url, correo, password, cajeros, ventas, items, activos, stock, repetidos, escaneos_paralelos, latencia, semilla, sin_rpc):
+    # Uso: python carga.py --cajeros 40 --ventas 20 --items 8 --semilla 1
+    #      python carga.py --url http://localhost:5000 --correo caja@karma.com --password ...
+    # Termina con código 1 si hay errores de stock o carritos duplicados (para correrlo antes de cada deploy)
+    if url:
+        if not correo or not password:
+            raise click.UsageError('--url requiere --correo y --password')
+        nuevo_cliente = lambda: _ClienteRemoto(url)
+        supervisor = {"correo": correo, "password": password}
+        usuarios = [{"correo": correo, "password": password, "usuario_id": None, "vendedor_id": 10000 + i}
+                    for i in range(1, cajeros + 1)]
+    else:
+        nuevo_cliente = _ClienteLocal
+        usuarios, supervisor = _preparar_local(cajeros, max(activos, 1000), activos, stock, latencia, rpcs=not sin_rpc)
+
+    cliente = nuevo_cliente()
+    estado, datos = cliente.solicitud('POST', '/api/auth/login', supervisor)
+    if estado != 200:
+        raise click.ClickException(f"No se pudo iniciar sesión ({estado}): {datos}")
+    token = datos['usuario']['token']
+    estado, listado = cliente.solicitud('GET', '/api/productos', token=token)
+    if estado != 200:
+        raise click.ClickException(f"No se pudo leer el catálogo ({estado}): {listado}")
+    productos = [{"id": p['id'], "precio": float(p.get('precio') or 0)} for p in listado[:activos]]
+    stock_inicial = leer_stock(cliente, token, productos)
+
+    resultados = Resultados()
+
+    def cajero(usuario):
+        # Semilla propia por cajero: la misma carga aunque los hilos se intercalen distinto
+        azar = random.Random(None if semilla is None else semilla * 1000 + usuario['vendedor_id'])
+        clientes = [nuevo_cliente() for _ in range(max(1, escaneos_paralelos))]
+        return sum(venta(clientes, resultados, usuario, productos, items, repetidos, azar) for _ in range(ventas))
+
+    inicio = time.monotonic()
+    with ThreadPoolExecutor(cajeros) as ejecutor:
+        completas = sum(ejecutor.map(cajero, usuarios))
+    duracion = time.monotonic() - inicio
+
+    if not url:
+        # Escribir lo pendiente en segundo plano antes de comparar (y en el sustituto, no en Supabase)
+        escritor_historial.vaciar()
+        registro_ultimo_login.escribir()
+    stock_final = leer_stock(cliente, token, productos)
+
+    click.echo(f"{cajeros} cajeros x {ventas} ventas de {items} escaneos: {completas} completas en {duracion:.1f} s "
+               f"({completas / duracion:.1f} ventas/s)")
+    click.echo(f"{'paso':<16} {'n':>6} {'error %':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for paso in PASOS + ('flujo completo',):
+        tiempos = sorted(resultados.tiempos[paso])
+        errores = sum(resultados.errores[paso].values())
+        porcentaje = errores * 100 / len(tiempos) if tiempos else 0
+        click.echo(f"{paso:<16} {len(tiempos):>6} {porcentaje:>8.1f} {percentil(tiempos, 0.50):>8.1f} "
+                   f"{percentil(tiempos, 0.95):>8.1f} {percentil(tiempos, 0.99):>8.1f}")
+        if errores:
+            click.echo(f"{'':<16} estados: {dict(resultados.errores[paso])}")
+    if resultados.incompletos:
+        click.echo(f"Carritos con menos unidades que las escaneadas: {resultados.incompletos}")
+
+    problemas = verificar(stock_inicial, stock_final, resultados)
+    for problema in problemas:
+        click.echo(problema)
+    if not problemas:
+        click.echo("Stock y carritos consistentes")
+    db.configurar_cliente(None)
+    sys.exit(1 if problemas else 0)
+
+
+if __name__ == '__main__':
+    carga()
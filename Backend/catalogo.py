@@ -0,0 +1,245 @@
+#Propósito: Cache en memoria del catálogo de productos con expiración (TTL) y límite de tamaño.
+
+from flask import request, jsonify, make_response
+from db import supabase, aplicar_or
+from compresion import coincide_etag
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+
+CATALOGO_TTL = float(os.environ.get('CATALOGO_CACHE_TTL', 60))
+CATALOGO_MAX_PRODUCTOS = int(os.environ.get('CATALOGO_CACHE_MAX', 10000))
+
+
+def calcular_etag(datos):
+    # ETag fuerte a partir del contenido, igual en todos los workers para los mismos datos
+    contenido = json.dumps(datos, sort_keys=True, default=str).encode()
+    return hashlib.sha1(contenido).hexdigest()
+
+
+class CacheCatalogo:
+    # Productos por id (LRU con TTL), índices hash por SKU y código de barras
+    # y una instantánea opcional del listado completo
+
+    def __init__(self, ttl=CATALOGO_TTL, max_productos=CATALOGO_MAX_PRODUCTOS):
+        self.ttl = ttl
+        self.max_productos = max_productos
+        self._lock = threading.RLock()
+        self._productos = OrderedDict()  # id -> (expira, producto, etag)
+        self._por_sku = {}  # sku -> id
+        self._por_codigo_barras = {}  # codigo_barras -> id
+        self._listado = None  # (expira, [ids], etag)
+
+    def _vigente(self, expira):
+        return expira > time.monotonic()
+
+    @staticmethod
+    def _clave(producto_id):
+        # Los ids llegan como int de Supabase o como texto desde el JSON de una solicitud ("5")
+        try:
+            return int(producto_id)
+        except (TypeError, ValueError):
+            return None
+
+    def _indexar(self, producto_id, producto):
+        if producto.get('sku'):
+            self._por_sku[producto['sku']] = producto_id
+        if producto.get('codigo_barras'):
+            self._por_codigo_barras[producto['codigo_barras']] = producto_id
+
+    def _desindexar(self, producto_id, producto):
+        # Solo borrar la entrada si todavía apunta a este producto
+        for indice, campo in ((self._por_sku, 'sku'), (self._por_codigo_barras, 'codigo_barras')):
+            codigo = producto.get(campo)
+            if codigo and indice.get(codigo) == producto_id:
+                del indice[codigo]
+
+    def _quitar(self, producto_id):
+        entrada = self._productos.pop(producto_id, None)
+        if entrada:
+            self._desindexar(producto_id, entrada[1])
+
+    def obtener(self, producto_id):
+        # Devuelve (producto, etag) o None si no está o expiró
+        producto_id = self._clave(producto_id)
+        with self._lock:
+            entrada = self._productos.get(producto_id)
+            if not entrada:
+                return None
+            expira, producto, etag = entrada
+            if not self._vigente(expira):
+                self._quitar(producto_id)
+                return None
+            self._productos.move_to_end(producto_id)
+            return producto, etag
+
+    def buscar_codigo(self, codigo):
+        # Resolver un SKU o código de barras en O(1) sin consultar Supabase
+        with self._lock:
+            producto_id = self._por_sku.get(codigo)
+            if producto_id is None:
+                producto_id = self._por_codigo_barras.get(codigo)
+            if producto_id is None:
+                return None
+            return self.obtener(producto_id)
+
+    def guardar(self, producto):
+        producto_id = self._clave((producto or {}).get('id'))
+        if producto_id is None:
+            return
+        etag = calcular_etag(producto)
+        with self._lock:
+            anterior = self._productos.get(producto_id)
+            if anterior is None or anterior[2] != etag:
+                # Fila nueva o distinta: el listado cacheado (y su ETag) ya no corresponde
+                self._listado = None
+            self._quitar(producto_id)
+            self._productos[producto_id] = (time.monotonic() + self.ttl, producto, etag)
+            self._indexar(producto_id, producto)
+            # Expulsar los menos usados si se supera el tamaño máximo
+            while len(self._productos) > self.max_productos:
+                self._quitar(next(iter(self._productos)))
+                # El listado completo ya no puede servirse desde la cache
+                self._listado = None
+
+    def listar(self):
+        # Devuelve (productos, etag) del listado completo o None si no está en cache
+        with self._lock:
+            if not self._listado or not self._vigente(self._listado[0]):
+                self._listado = None
+                return None
+            _, ids, etag = self._listado
+            productos = []
+            for producto_id in ids:
+                entrada = self.obtener(producto_id)
+                if entrada is None:
+                    self._listado = None
+                    return None
+                productos.append(entrada[0])
+            return productos, etag
+
+    def guardar_listado(self, productos):
+        with self._lock:
+            # Sin espacio para todo el catálogo solo se cachean los productos individuales
+            if len(productos) > self.max_productos:
+                self._listado = None
+                return calcular_etag(productos)
+            for producto in productos:
+                self.guardar(producto)
+            etag = calcular_etag(productos)
+            ids = [self._clave(p.get('id')) for p in productos]
+            self._listado = (time.monotonic() + self.ttl, [i for i in ids if i is not None], etag)
+            return etag
+
+    def invalidar(self, producto_id=None):
+        # Sin id se vacía toda la cache; con id se elimina ese producto y el listado
+        with self._lock:
+            if producto_id is None:
+                self._productos.clear()
+                self._por_sku.clear()
+                self._por_codigo_barras.clear()
+            else:
+                self._quitar(self._clave(producto_id))
+            self._listado = None
+
+
+catalogo = CacheCatalogo()
+
+
+def obtener_producto(producto_id):
+    # Devuelve (producto, etag) desde la cache o consultando Supabase; None si no existe
+    entrada = catalogo.obtener(producto_id)
+    if entrada:
+        return entrada
+    resultado = supabase.table('productos').select('*').eq('id', producto_id).execute()
+    if not resultado.data:
+        return None
+    producto = resultado.data[0]
+    catalogo.guardar(producto)
+    return producto, calcular_etag(producto)
+
+
+def _lista_in(valores):
+    # Valores entre comillas para in.(...): un código puede traer comas o paréntesis
+    return ','.join('"' + str(v).replace('\\', '\\\\').replace('"', '\\"') + '"' for v in valores)
+
+
+def id_desde_texto(texto):
+    # Id entero escrito con dígitos ASCII, o None. str.isdigit() acepta '²' o '٣', que int() rechaza;
+    # y un número que no cabe en bigint no puede ser un id (haría fallar toda la consulta)
+    texto = texto.strip()
+    if texto.isascii() and texto.isdigit() and int(texto) < 2 ** 63:
+        return int(texto)
+    return None
+
+
+def buscar_por_codigos(codigos):
+    # Resolver valores escaneados: QR "SKU|ID", SKU, código de barras o id numérico.
+    # Devuelve {codigo: (producto, etag)} con los encontrados; lo que no está en la cache
+    # se resuelve con una sola consulta para toda la ráfaga
+    encontrados = {}
+    pendientes = {}  # codigo -> (sku o código, id del QR, id leído directamente)
+    for codigo in dict.fromkeys(codigos):
+        texto = codigo.strip()
+        if not texto:
+            continue
+        id_qr = None
+        # QR generado por /productos/<id>/qr: el id viene después del último "|"
+        if '|' in texto:
+            sku, _, producto_id = texto.rpartition('|')
+            id_qr = id_desde_texto(producto_id)
+            if id_qr is not None:
+                entrada = catalogo.obtener(id_qr)
+                if entrada:
+                    encontrados[codigo] = entrada
+                    continue
+            texto = sku
+        # Índice hash en memoria (mantenido al escribir productos)
+        entrada = catalogo.buscar_codigo(texto)
+        if entrada:
+            encontrados[codigo] = entrada
+            continue
+        pendientes[codigo] = (texto, id_qr, id_desde_texto(texto))
+    
+    if pendientes:
+        # Índices btree en la base de datos (idx_productos_sku / idx_productos_codigo_barras) y la clave primaria
+        textos = _lista_in(dict.fromkeys(texto for texto, _, _ in pendientes.values()))
+        ids = sorted({i for _, id_qr, id_leido in pendientes.values() for i in (id_qr, id_leido) if i is not None})
+        condiciones = f'sku.in.({textos}),codigo_barras.in.({textos})'
+        if ids:
+            condiciones += f",id.in.({','.join(map(str, ids))})"
+        filas = aplicar_or(supabase.table('productos').select('*'), condiciones).execute().data
+        por_id, por_sku, por_codigo_barras = {}, {}, {}
+        for producto in filas:
+            catalogo.guardar(producto)
+            por_id[producto['id']] = producto
+            por_sku.setdefault(producto.get('sku'), producto)
+            por_codigo_barras.setdefault(producto.get('codigo_barras'), producto)
+        for codigo, (texto, id_qr, id_leido) in pendientes.items():
+            # Mismo orden que un escaneo suelto: id del QR, SKU, código de barras y, al final, el id leído
+            producto = por_id.get(id_qr) or por_sku.get(texto) or por_codigo_barras.get(texto) or por_id.get(id_leido)
+            if producto:
+                encontrados[codigo] = (producto, calcular_etag(producto))
+    return encontrados
+
+
+def buscar_por_codigo(codigo):
+    # Un solo escaneo: (producto, etag) o None
+    return buscar_por_codigos([codigo]).get(codigo)
+
+
+def respuesta_con_etag(datos, etag, campos=None):
+    # Con ?fields= la cache guarda filas completas y la proyección se recorta aquí, con su propia ETag
+    if campos is not None:
+        datos = campos.recortar(datos)
+        etag = calcular_etag([etag, campos.clave])
+    # 304 sin cuerpo si el cliente ya tiene esta versión (If-None-Match)
+    if coincide_etag(etag):
+        respuesta = make_response('', 304)
+    else:
+        respuesta = make_response(jsonify(datos), 200)
+    respuesta.set_etag(etag)
+    return respuesta
@@ -0,0 +1,77 @@
+#Propósito: Compresión negociada (brotli/gzip) y ETags fuertes con 304 para los listados grandes.
+
+from flask import request
+import gzip
+import hashlib
+import os
+
+try:
+    import brotli
+except ImportError:
+    # Sin el paquete Brotli solo se negocia gzip
+    brotli = None
+
+# Respuestas más chicas que esto no se comprimen (el encabezado y la CPU no compensan)
+COMPRESION_MINIMO = int(os.environ.get('COMPRESION_MINIMO', 1024))
+COMPRESION_GZIP_NIVEL = int(os.environ.get('COMPRESION_GZIP_NIVEL', 6))
+COMPRESION_BROTLI_CALIDAD = int(os.environ.get('COMPRESION_BROTLI_CALIDAD', 5))
+
+# Listados cuya ETag se calcula del cuerpo si la ruta no fijó una (productos usa la del catálogo)
+ENDPOINTS_ETAG = {'inventario.obtener_inventario', 'inventario.obtener_historial', 'ventas.obtener_ventas'}
+
+TIPOS_COMPRIMIBLES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html', 'image/svg+xml')
+
+# Cada codificación es otra representación: su ETag fuerte lleva un sufijo (como Apache)
+SUFIJOS = {'br': '-br', 'gzip': '-gzip'}
+
+
+def codificaciones():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def coincide_etag(etag):
+    # If-None-Match con la ETag de cualquier codificación (abc, abc-gzip, abc-br)
+    return any(request.if_none_match.contains(etag + sufijo) for sufijo in ('',) + tuple(SUFIJOS.values()))
+
+
+def comprimir(codificacion, datos):
+    if codificacion == 'br':
+        return brotli.compress(datos, quality=COMPRESION_BROTLI_CALIDAD)
+    return gzip.compress(datos, compresslevel=COMPRESION_GZIP_NIVEL)
+
+
+def _etag_y_compresion(response):
+    # Los streams (exportaciones, SSE) se envían tal cual
+    if response.direct_passthrough or response.is_streamed:
+        return response
+
+    etag, _ = response.get_etag()
+    if etag is None and request.method == 'GET' and response.status_code == 200 and request.endpoint in ENDPOINTS_ETAG:
+        etag = hashlib.sha1(response.get_data()).hexdigest()
+        response.set_etag(etag)
+    if etag is not None and response.status_code == 200 and coincide_etag(etag):
+        # El cliente ya tiene esta versión: 304 sin cuerpo
+        response.status_code = 304
+        response.set_data(b'')
+        return response
+
+    if response.status_code != 200 or 'Content-Encoding' in response.headers or response.mimetype not in TIPOS_COMPRIMIBLES:
+        return response
+    response.vary.add('Accept-Encoding')
+    datos = response.get_data()
+    if len(datos) < COMPRESION_MINIMO:
+        return response
+    codificacion = request.accept_encodings.best_match(codificaciones())
+    if codificacion is None:
+        return response
+    response.set_data(comprimir(codificacion, datos))
+    response.headers['Content-Encoding'] = codificacion
+    if etag is not None:
+        response.set_etag(etag + SUFIJOS[codificacion])
+    return response
+
+
+def configurar(app):
+    # Registrar después de metricas.configurar: los after_request corren en orden inverso,
+    # así las métricas ven el 304 y el resto de los hooks la respuesta ya comprimida
+    app.after_request(_etag_y_compresion)
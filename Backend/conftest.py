@@ -0,0 +1,45 @@
+import pytest
+import auth
+import carrito
+import db
+import inventario
+import productos
+import resumenes
+import usuarios
+import ventas
+from app import app
+from auth import RegistroUltimoLogin, crear_token
+from catalogo import catalogo
+from historial import escritor_historial
+from postgrest_memoria import PostgrestMemoria
+
+
+@pytest.fixture
+def api(monkeypatch):
+    # api(tablas) -> (cliente de prueba, encabezados con token de admin, sustituto en memoria).
+    # Al terminar se restauran TESTING, el cliente de Supabase, la cache del catálogo,
+    # el registro de last_login y los indicadores de RPC/tablas no instaladas
+    monkeypatch.setitem(app.config, 'TESTING', True)
+    for modulo in (carrito, inventario, productos, resumenes, ventas):
+        for nombre, valor in list(vars(modulo).items()):
+            if nombre.endswith('_disponible') and isinstance(valor, bool):
+                monkeypatch.setattr(modulo, nombre, valor)
+    monkeypatch.setattr(auth, 'registro_ultimo_login', RegistroUltimoLogin(intervalo=3600))
+    monkeypatch.setattr(usuarios, 'registro_ultimo_login', auth.registro_ultimo_login)
+
+    def crear(tablas=None, **opciones):
+        memoria = PostgrestMemoria(tablas, **opciones)
+        db.configurar_cliente(memoria.cliente())
+        catalogo.invalidar()
+        with app.app_context():
+            token = crear_token({"id": 1, "nombre": "Ana", "correo": "ana@karma.com", "role": "admin"})
+        return app.test_client(), {'Authorization': f'Bearer {token}'}, memoria
+
+    try:
+        yield crear
+    finally:
+        # Lo que quedó en segundo plano se escribe en el sustituto, no en Supabase
+        escritor_historial.vaciar()
+        auth.registro_ultimo_login.escribir()
+        catalogo.invalidar()
+        db.configurar_cliente(None)
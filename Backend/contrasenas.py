@@ -0,0 +1,189 @@
+#Propósito: Hash y verificación de contraseñas (scrypt o PBKDF2) en un pool de procesos acotado, con control de admisión.
+
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as EsperaAgotada
+from concurrent.futures.process import BrokenProcessPool
+import base64
+import functools
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+
+CONTRASENA_ALGORITMO = os.environ.get('CONTRASENA_ALGORITMO', 'scrypt')
+CONTRASENA_PROCESOS = int(os.environ.get('CONTRASENA_PROCESOS', 2))
+# Verificaciones admitidas a la vez por worker (en el pool o esperando turno); las demás se rechazan
+CONTRASENA_COLA = int(os.environ.get('CONTRASENA_COLA', CONTRASENA_PROCESOS * 8))
+CONTRASENA_ESPERA = float(os.environ.get('CONTRASENA_ESPERA', 5))
+SCRYPT_N = int(os.environ.get('SCRYPT_N', 2 ** 14))
+SCRYPT_R = int(os.environ.get('SCRYPT_R', 8))
+SCRYPT_P = int(os.environ.get('SCRYPT_P', 1))
+PBKDF2_ITERACIONES = int(os.environ.get('PBKDF2_ITERACIONES', 600000))
+
+
+class ContrasenasSaturadas(Exception):
+    # No hay lugar en la cola de verificación: responder 503 y que el cliente reintente
+    pass
+
+
+def _b64(datos):
+    return base64.b64encode(datos).decode()
+
+
+def _hash_scrypt(contrasena, sal=None, n=None, r=None, p=None):
+    sal = sal or secrets.token_bytes(16)
+    n, r, p = n or SCRYPT_N, r or SCRYPT_R, p or SCRYPT_P
+    clave = hashlib.scrypt(contrasena.encode(), salt=sal, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024, dklen=32)
+    return f"scrypt${n}${r}${p}${_b64(sal)}${_b64(clave)}"
+
+
+def _verificar_scrypt(contrasena, almacenado):
+    _, n, r, p, sal, _ = almacenado.split('$')
+    calculado = _hash_scrypt(contrasena, base64.b64decode(sal), int(n), int(r), int(p))
+    # Cualquier parámetro distinto de la configuración actual (n, r o p) migra el hash
+    return hmac.compare_digest(calculado, almacenado), (int(n), int(r), int(p)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def _hash_pbkdf2(contrasena, sal=None, iteraciones=None):
+    sal = sal or secrets.token_bytes(16)
+    iteraciones = iteraciones or PBKDF2_ITERACIONES
+    clave = hashlib.pbkdf2_hmac('sha256', contrasena.encode(), sal, iteraciones)
+    return f"pbkdf2_sha256${iteraciones}${_b64(sal)}${_b64(clave)}"
+
+
+def _verificar_pbkdf2(contrasena, almacenado):
+    _, iteraciones, sal, _ = almacenado.split('$')
+    calculado = _hash_pbkdf2(contrasena, base64.b64decode(sal), int(iteraciones))
+    return hmac.compare_digest(calculado, almacenado), int(iteraciones) < PBKDF2_ITERACIONES
+
+
+def _verificar_sha256(contrasena, almacenado):
+    # Formato anterior: SHA-256 sin sal, siempre se vuelve a hashear
+    calculado = hashlib.sha256(contrasena.encode()).hexdigest()
+    return hmac.compare_digest(calculado, almacenado), True
+
+
+# Prefijo -> (hash, verificación); la verificación devuelve (coincide, parámetros desactualizados)
+ALGORITMOS = {
+    'scrypt': (_hash_scrypt, _verificar_scrypt),
+    'pbkdf2_sha256': (_hash_pbkdf2, _verificar_pbkdf2),
+}
+
+
+def hashear_local(contrasena):
+    return ALGORITMOS[CONTRASENA_ALGORITMO][0](contrasena)
+
+
+@functools.lru_cache(maxsize=None)
+def _hash_ficticio():
+    # Hash de una contraseña aleatoria con los parámetros actuales, para correos no registrados
+    return hashear_local(secrets.token_hex(16))
+
+
+def verificar_local(contrasena, almacenado):
+    # Devuelve (coincide, hash nuevo si hay que reemplazar el almacenado); se ejecuta en el pool
+    if not almacenado:
+        return False, None
+    algoritmo = almacenado.split('$', 1)[0]
+    if algoritmo in ALGORITMOS:
+        coincide, desactualizado = ALGORITMOS[algoritmo][1](contrasena, almacenado)
+        desactualizado = desactualizado or algoritmo != CONTRASENA_ALGORITMO
+    elif len(almacenado) == 64:
+        coincide, desactualizado = _verificar_sha256(contrasena, almacenado)
+    else:
+        return False, None
+    return coincide, (hashear_local(contrasena) if coincide and desactualizado else None)
+
+
+class PoolContrasenas:
+    # Un pool de procesos por worker de gunicorn: el cálculo del KDF no ocupa el worker y a lo sumo
+    # "cola" verificaciones esperan a la vez; si no hay lugar en "espera" segundos se rechaza
+
+    def __init__(self, procesos=CONTRASENA_PROCESOS, cola=CONTRASENA_COLA, espera=CONTRASENA_ESPERA):
+        self.procesos = procesos
+        self.espera = espera
+        self._admision = threading.BoundedSemaphore(cola)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid_pool = None
+        self._estadisticas = {'completadas': 0, 'rechazadas': 0, 'en_curso': 0, 'segundos': 0.0}
+
+    def _obtener_pool(self):
+        with self._lock:
+            if self._pool is None or self._pid_pool != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.procesos)
+                self._pid_pool = os.getpid()
+            return self._pool
+
+    def _descartar_pool(self, pool):
+        # Un proceso del pool murió (p. ej. por falta de memoria) y el pool ya no acepta tareas:
+        # el próximo _obtener_pool crea otro
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _ejecutar(self, funcion, *argumentos):
+        inicio = time.monotonic()
+        for intento in range(2):
+            pool = self._obtener_pool()
+            try:
+                return self._enviar(pool, inicio, funcion, *argumentos)
+            except BrokenProcessPool:
+                self._descartar_pool(pool)
+                if intento:
+                    raise
+
+    def _enviar(self, pool, inicio, funcion, *argumentos):
+        if not self._admision.acquire(timeout=max(self.espera - (time.monotonic() - inicio), 0)):
+            self._contar('rechazadas')
+            raise ContrasenasSaturadas("Demasiadas verificaciones de contraseña en curso")
+        self._contar('en_curso', 1)
+        try:
+            futuro = pool.submit(funcion, *argumentos)
+        except Exception:
+            self._liberar()
+            raise
+        # El lugar se libera cuando termina el cálculo, aunque quien esperaba ya se haya ido:
+        # así nunca hay más de "cola" tareas en el pool
+        futuro.add_done_callback(lambda _: self._liberar())
+        restante = max(self.espera - (time.monotonic() - inicio), 0)
+        try:
+            # Espera para entrar al pool más el cálculo; si se agota, el cálculo se descarta
+            resultado = futuro.result(timeout=restante + self.espera)
+        except EsperaAgotada:
+            futuro.cancel()
+            self._contar('rechazadas')
+            raise ContrasenasSaturadas("La verificación de contraseña superó el tiempo de espera")
+        self._contar('completadas', segundos=time.monotonic() - inicio)
+        return resultado
+
+    def _liberar(self):
+        self._admision.release()
+        self._contar('en_curso', -1)
+
+    def _contar(self, clave, cantidad=1, segundos=0.0):
+        with self._lock:
+            self._estadisticas[clave] += cantidad
+            self._estadisticas['segundos'] += segundos
+
+    def hashear(self, contrasena):
+        return self._ejecutar(hashear_local, contrasena)
+
+    def verificar(self, contrasena, almacenado):
+        # (coincide, hash nuevo o None): el rehash se calcula en la misma tarea del pool
+        return self._ejecutar(verificar_local, contrasena, almacenado)
+
+    def verificar_ausente(self, contrasena):
+        # Correo no registrado: el mismo cálculo que una verificación real, así el tiempo de
+        # respuesta no revela qué correos existen. Siempre (False, None)
+        self._ejecutar(verificar_local, contrasena, _hash_ficticio())
+        return False, None
+
+    def estadisticas(self):
+        with self._lock:
+            return dict(self._estadisticas)
+
+
+pool_contrasenas = PoolContrasenas()
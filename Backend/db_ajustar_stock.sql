@@ -0,0 +1,20 @@
+-- Ajuste relativo de stock de varios productos en una sola sentencia
+-- p_ajustes: [{"producto_id": 1, "diferencia": 5}, {"producto_id": 2, "diferencia": -3}, ...]
+-- Las diferencias de un mismo producto se suman; solo se aplican las que no dejan el stock
+-- negativo (la fila se bloquea en el UPDATE, así que no se pierden ajustes concurrentes)
+-- Uso desde la API: supabase.rpc('ajustar_stock', {'p_ajustes': [...]})
+CREATE OR REPLACE FUNCTION public.ajustar_stock(p_ajustes JSONB)
+RETURNS TABLE (producto_id BIGINT, stock_nuevo INTEGER)
+LANGUAGE sql
+AS $$
+    UPDATE public.productos p
+    SET stock = p.stock + a.diferencia
+    FROM (
+        SELECT j.producto_id, SUM(j.diferencia) AS diferencia
+        FROM jsonb_to_recordset(p_ajustes) AS j(producto_id BIGINT, diferencia INTEGER)
+        GROUP BY j.producto_id
+    ) a
+    WHERE p.id = a.producto_id
+      AND p.stock + a.diferencia >= 0
+    RETURNING p.id, p.stock;
+$$;
@@ -0,0 +1,39 @@
+-- Una sola línea de carrito por (vendedor_id, producto_id)
+-- Primero se fusionan las líneas duplicadas que pudieran existir (se suman las cantidades)
+WITH duplicados AS (
+    SELECT MIN(id) AS id, COALESCE(vendedor_id, 0) AS vendedor_id, producto_id, SUM(cantidad) AS cantidad
+    FROM public.carrito
+    GROUP BY 2, 3
+    HAVING COUNT(*) > 1
+), borrados AS (
+    DELETE FROM public.carrito c
+    USING duplicados d
+    WHERE COALESCE(c.vendedor_id, 0) = d.vendedor_id
+      AND c.producto_id = d.producto_id
+      AND c.id <> d.id
+)
+UPDATE public.carrito c
+SET cantidad = d.cantidad
+FROM duplicados d
+WHERE c.id = d.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_carrito_vendedor_producto
+ON public.carrito ((COALESCE(vendedor_id, 0)), producto_id);
+
+-- Agregar una o varias líneas en una sola llamada: inserta o suma la cantidad en el servidor
+-- p_items: [{"producto_id": 1, "cantidad": 2, "vendedor_id": 7}, ...]
+-- Los productos inexistentes se omiten; "nuevo" indica si la línea se creó en esta llamada
+-- Uso desde la API: supabase.rpc('agregar_carrito', {'p_items': [...]})
+CREATE OR REPLACE FUNCTION public.agregar_carrito(p_items JSONB)
+RETURNS TABLE (item JSONB, nuevo BOOLEAN)
+LANGUAGE sql
+AS $$
+    INSERT INTO public.carrito AS c (vendedor_id, producto_id, cantidad)
+    SELECT NULLIF(i.vendedor_id, 0), i.producto_id, SUM(i.cantidad)
+    FROM jsonb_to_recordset(p_items) AS i(vendedor_id BIGINT, producto_id BIGINT, cantidad INTEGER)
+    JOIN public.productos p ON p.id = i.producto_id
+    GROUP BY NULLIF(i.vendedor_id, 0), i.producto_id
+    ON CONFLICT ((COALESCE(vendedor_id, 0)), producto_id)
+    DO UPDATE SET cantidad = c.cantidad + EXCLUDED.cantidad
+    RETURNING to_jsonb(c), (c.xmax = 0);
+$$;
@@ -0,0 +1,134 @@
+-- Resumen del carrito por vendedor (subtotal, descuentos, total y líneas) mantenido por triggers
+-- vendedor_id = 0 agrupa las líneas sin vendedor
+CREATE TABLE IF NOT EXISTS public.carrito_resumen (
+    vendedor_id BIGINT PRIMARY KEY,
+    subtotal NUMERIC NOT NULL DEFAULT 0,
+    descuentos NUMERIC NOT NULL DEFAULT 0,
+    total NUMERIC GENERATED ALWAYS AS (subtotal - descuentos) STORED,
+    items INTEGER NOT NULL DEFAULT 0,
+    actualizado TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_carrito_vendedor_id ON public.carrito USING btree (vendedor_id);
+CREATE INDEX IF NOT EXISTS idx_carrito_producto_id ON public.carrito USING btree (producto_id);
+
+-- Porcentaje de descuento del producto (0 si la columna no existe o es nula)
+CREATE OR REPLACE FUNCTION public.carrito_descuento(p_producto public.productos)
+RETURNS NUMERIC
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT GREATEST(COALESCE((to_jsonb(p_producto)->>'descuento')::NUMERIC, 0), 0);
+$$;
+
+-- Importe de cada línea guardado en la propia línea: al quitarla se resta lo que se sumó,
+-- aunque el producto ya no exista (carrito.fk_producto borra las líneas en cascada)
+ALTER TABLE public.carrito
+    ADD COLUMN IF NOT EXISTS resumen_subtotal NUMERIC NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS resumen_descuentos NUMERIC NOT NULL DEFAULT 0;
+
+-- Calcular el importe de la línea antes de guardarla, con el precio y descuento vigentes
+CREATE OR REPLACE FUNCTION public.carrito_importe_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_producto public.productos;
+BEGIN
+    SELECT * INTO v_producto FROM public.productos WHERE id = NEW.producto_id;
+    NEW.resumen_subtotal := COALESCE(v_producto.precio, 0) * NEW.cantidad;
+    NEW.resumen_descuentos := NEW.resumen_subtotal * COALESCE(public.carrito_descuento(v_producto), 0) / 100;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_carrito_importe ON public.carrito;
+CREATE TRIGGER trg_carrito_importe
+BEFORE INSERT OR UPDATE ON public.carrito
+FOR EACH ROW EXECUTE FUNCTION public.carrito_importe_trigger();
+
+-- Sumar (o restar, con importes y líneas negativos) una línea al resumen de su vendedor
+DROP FUNCTION IF EXISTS public.carrito_resumen_sumar(BIGINT, BIGINT, NUMERIC, INTEGER);
+CREATE OR REPLACE FUNCTION public.carrito_resumen_sumar(
+    p_vendedor_id BIGINT,
+    p_subtotal NUMERIC,
+    p_descuentos NUMERIC,
+    p_lineas INTEGER
+)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO public.carrito_resumen AS r (vendedor_id, subtotal, descuentos, items)
+    VALUES (COALESCE(p_vendedor_id, 0), COALESCE(p_subtotal, 0), COALESCE(p_descuentos, 0), p_lineas)
+    ON CONFLICT (vendedor_id) DO UPDATE SET
+        subtotal = r.subtotal + EXCLUDED.subtotal,
+        descuentos = r.descuentos + EXCLUDED.descuentos,
+        items = r.items + EXCLUDED.items,
+        actualizado = now();
+$$;
+
+-- Cada alta, baja o cambio en carrito ajusta solo el resumen de ese vendedor con los importes guardados
+CREATE OR REPLACE FUNCTION public.carrito_resumen_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.carrito_resumen_sumar(OLD.vendedor_id, -OLD.resumen_subtotal, -OLD.resumen_descuentos, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM public.carrito_resumen_sumar(NEW.vendedor_id, NEW.resumen_subtotal, NEW.resumen_descuentos, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_carrito_resumen ON public.carrito;
+CREATE TRIGGER trg_carrito_resumen
+AFTER INSERT OR UPDATE OR DELETE ON public.carrito
+FOR EACH ROW EXECUTE FUNCTION public.carrito_resumen_trigger();
+
+-- Un cambio de precio o descuento recalcula el importe de las líneas con ese producto;
+-- los triggers de carrito ajustan después el resumen de cada vendedor
+CREATE OR REPLACE FUNCTION public.carrito_resumen_precio_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF OLD.precio IS NOT DISTINCT FROM NEW.precio
+       AND public.carrito_descuento(OLD) = public.carrito_descuento(NEW) THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE public.carrito SET cantidad = cantidad WHERE producto_id = NEW.id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_carrito_resumen_precio ON public.productos;
+CREATE TRIGGER trg_carrito_resumen_precio
+AFTER UPDATE ON public.productos
+FOR EACH ROW EXECUTE FUNCTION public.carrito_resumen_precio_trigger();
+
+-- Recalcular todos los resúmenes desde carrito (instalación inicial o corrección)
+-- Uso: flask --app app carrito reconstruir-resumen
+CREATE OR REPLACE FUNCTION public.reconstruir_carrito_resumen()
+RETURNS SETOF public.carrito_resumen
+LANGUAGE sql
+AS $$
+    -- El UPDATE vuelve a calcular el importe de cada línea (trg_carrito_importe)
+    UPDATE public.carrito SET cantidad = cantidad WHERE TRUE;
+
+    DELETE FROM public.carrito_resumen WHERE TRUE;
+
+    INSERT INTO public.carrito_resumen (vendedor_id, subtotal, descuentos, items)
+    SELECT COALESCE(c.vendedor_id, 0),
+           SUM(c.resumen_subtotal),
+           SUM(c.resumen_descuentos),
+           COUNT(*)
+    FROM public.carrito c
+    GROUP BY 1
+    RETURNING *;
+$$;
+
+SELECT COUNT(*) FROM public.reconstruir_carrito_resumen();
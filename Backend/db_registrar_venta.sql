@@ -0,0 +1,121 @@
+-- Registrar una venta completa (venta, detalles, stock y pagos) en una sola llamada RPC
+-- Uso desde la API: supabase.rpc('registrar_venta', {...})
+CREATE OR REPLACE FUNCTION public.registrar_venta(
+    p_venta JSONB,
+    p_items JSONB DEFAULT '[]'::JSONB,
+    p_pagos JSONB DEFAULT '[]'::JSONB,
+    p_actualizar_inventario BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (venta JSONB, productos JSONB)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+    v_venta public.ventas%ROWTYPE;
+    v_productos JSONB := '[]'::JSONB;
+    v_stock JSONB;
+BEGIN
+    -- Registrar la venta
+    INSERT INTO public.ventas (cliente_id, usuario_id, fecha, total, subtotal, descuento)
+    SELECT r.cliente_id, r.usuario_id, COALESCE(r.fecha, now()), r.total,
+           COALESCE(r.subtotal, r.total), COALESCE(r.descuento, 0)
+    FROM jsonb_populate_record(NULL::public.ventas, p_venta) r
+    RETURNING * INTO v_venta;
+
+    -- Detalles y descuento de stock en bloque (el stock nunca queda negativo)
+    IF p_actualizar_inventario THEN
+        -- Bloquear los productos del ticket (en orden de id, sin interbloqueos entre ventas) antes de
+        -- leer el stock anterior: una venta simultánea espera aquí y el historial parte del stock que dejó
+        PERFORM 1
+        FROM public.productos
+        WHERE id IN (SELECT (e->>'producto_id')::BIGINT FROM jsonb_array_elements(p_items) e WHERE e ? 'producto_id')
+        ORDER BY id
+        FOR UPDATE;
+
+        WITH items AS (
+            SELECT (e.item->>'producto_id')::BIGINT AS producto_id,
+                   COALESCE((e.item->>'cantidad')::INTEGER, 0) AS cantidad,
+                   (e.item->>'precio')::NUMERIC AS precio,
+                   e.item->>'nombre' AS nombre,
+                   e.orden
+            FROM jsonb_array_elements(p_items) WITH ORDINALITY AS e(item, orden)
+            WHERE e.item ? 'producto_id'
+        ),
+        detalles AS (
+            INSERT INTO public.detalles_venta (venta_id, producto_id, nombre, precio, cantidad, sku, codigo_barras)
+            SELECT v_venta.id, p.id,
+                   COALESCE(p.nombre, i.nombre, 'Producto sin nombre'),
+                   COALESCE(i.precio, p.precio, 0),
+                   i.cantidad,
+                   COALESCE(p.sku, ''),
+                   COALESCE(p.codigo_barras, '')
+            FROM items i
+            JOIN public.productos p ON p.id = i.producto_id
+            ORDER BY i.orden
+            RETURNING producto_id, nombre, precio, cantidad, sku, codigo_barras
+        ),
+        stock AS (
+            UPDATE public.productos p
+            SET stock = GREATEST(0, COALESCE(p.stock, 0) - t.cantidad)
+            FROM (SELECT producto_id, SUM(cantidad) AS cantidad FROM items GROUP BY producto_id) t
+            WHERE p.id = t.producto_id
+            -- Con las filas bloqueadas, stock + cantidad es el stock anterior (salvo que se haya
+            -- recortado a cero: entonces el anterior era menor que lo vendido y se toma el leído)
+            RETURNING p.id,
+                      CASE WHEN p.stock > 0 THEN p.stock + t.cantidad
+                           ELSE (SELECT a.stock FROM public.productos a WHERE a.id = p.id) END AS stock_anterior,
+                      p.stock AS stock_nuevo
+        )
+        SELECT (
+                   SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                              'id', d.producto_id,
+                              'nombre', d.nombre,
+                              'cantidad', d.cantidad,
+                              'precio', d.precio,
+                              'sku', d.sku,
+                              'codigo_barras', d.codigo_barras
+                          )), '[]'::JSONB)
+                   FROM detalles d
+               ),
+               (SELECT jsonb_agg(to_jsonb(s)) FROM stock s)
+        INTO v_productos, v_stock;
+
+        -- Historial de inventario de la venta en la misma transacción, si la tabla existe
+        IF v_stock IS NOT NULL AND to_regclass('public.historial_inventario') IS NOT NULL THEN
+            INSERT INTO public.historial_inventario (producto_id, stock_anterior, stock_nuevo, diferencia, fecha, usuario, motivo)
+            SELECT s.id, s.stock_anterior, s.stock_nuevo, s.stock_nuevo - s.stock_anterior, now(),
+                   COALESCE(v_venta.usuario_id::TEXT, 'sistema'), 'Venta #' || v_venta.id
+            FROM jsonb_to_recordset(v_stock) AS s(id BIGINT, stock_anterior INTEGER, stock_nuevo INTEGER);
+        END IF;
+    END IF;
+
+    -- Registrar todos los pagos de la venta con un solo insert
+    INSERT INTO public.pagos (venta_id, metodo_pago, monto, fecha, referencia, estado, datos_adicionales)
+    SELECT v_venta.id, r.metodo_pago, r.monto, COALESCE(r.fecha, v_venta.fecha),
+           COALESCE(r.referencia, ''), COALESCE(r.estado, 'completado'), r.datos_adicionales
+    FROM jsonb_populate_recordset(NULL::public.pagos, p_pagos) r;
+
+    -- Resumen diario incremental (db_resumen_diario.sql), si está instalado
+    IF to_regproc('public.acumular_resumen_diario') IS NOT NULL THEN
+        PERFORM public.acumular_resumen_diario(
+            v_venta.fecha::DATE,
+            1,
+            COALESCE(v_venta.total, 0),
+            COALESCE((
+                SELECT jsonb_object_agg(x.metodo_pago, x.monto)
+                FROM (
+                    SELECT r.metodo_pago, SUM(r.monto) AS monto
+                    FROM jsonb_populate_recordset(NULL::public.pagos, p_pagos) r
+                    WHERE r.metodo_pago IS NOT NULL
+                    GROUP BY r.metodo_pago
+                ) x
+            ), '{}'::JSONB)
+        );
+    END IF;
+
+    RETURN QUERY SELECT to_jsonb(v_venta), v_productos;
+END;
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_detalles_venta_venta_id
+ON public.detalles_venta USING btree (venta_id);
@@ -0,0 +1,83 @@
+-- Resumen diario de ventas mantenido de forma incremental (una fila por día)
+CREATE TABLE IF NOT EXISTS public.ventas_resumen_diario (
+    fecha DATE PRIMARY KEY,
+    total_ventas INTEGER NOT NULL DEFAULT 0,
+    monto_total NUMERIC NOT NULL DEFAULT 0,
+    metodos_pago JSONB NOT NULL DEFAULT '{}'::JSONB,
+    actualizado TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Sumar ventas, monto y montos por método de pago al resumen de un día
+-- Uso desde la API: supabase.rpc('acumular_resumen_diario', {...})
+CREATE OR REPLACE FUNCTION public.acumular_resumen_diario(
+    p_fecha DATE,
+    p_ventas INTEGER DEFAULT 0,
+    p_monto NUMERIC DEFAULT 0,
+    p_metodos JSONB DEFAULT '{}'::JSONB
+)
+RETURNS SETOF public.ventas_resumen_diario
+LANGUAGE sql
+AS $$
+    INSERT INTO public.ventas_resumen_diario AS r (fecha, total_ventas, monto_total, metodos_pago)
+    VALUES (p_fecha, p_ventas, p_monto, p_metodos)
+    ON CONFLICT (fecha) DO UPDATE SET
+        total_ventas = r.total_ventas + EXCLUDED.total_ventas,
+        monto_total = r.monto_total + EXCLUDED.monto_total,
+        metodos_pago = (
+            SELECT COALESCE(jsonb_object_agg(m.key, m.monto), '{}'::JSONB)
+            FROM (
+                SELECT e.key, SUM(e.value::NUMERIC) AS monto
+                FROM (
+                    SELECT * FROM jsonb_each_text(r.metodos_pago)
+                    UNION ALL
+                    SELECT * FROM jsonb_each_text(EXCLUDED.metodos_pago)
+                ) e
+                GROUP BY e.key
+            ) m
+        ),
+        actualizado = now()
+    RETURNING *;
+$$;
+
+-- Recalcular el resumen desde el historial de ventas y pagos (NULL = sin límite)
+-- Uso: flask --app app ventas reconstruir-resumenes --desde 2025-01-01
+CREATE OR REPLACE FUNCTION public.reconstruir_resumen_diario(
+    p_desde DATE DEFAULT NULL,
+    p_hasta DATE DEFAULT NULL
+)
+RETURNS SETOF public.ventas_resumen_diario
+LANGUAGE sql
+AS $$
+    DELETE FROM public.ventas_resumen_diario
+    WHERE (p_desde IS NULL OR fecha >= p_desde)
+      AND (p_hasta IS NULL OR fecha <= p_hasta);
+
+    INSERT INTO public.ventas_resumen_diario (fecha, total_ventas, monto_total, metodos_pago)
+    SELECT d.fecha,
+           COALESCE(v.total_ventas, 0),
+           COALESCE(v.monto_total, 0),
+           COALESCE(p.metodos_pago, '{}'::JSONB)
+    FROM (
+        SELECT fecha::DATE AS fecha FROM public.ventas
+        UNION
+        SELECT fecha::DATE FROM public.pagos
+    ) d
+    LEFT JOIN (
+        SELECT fecha::DATE AS fecha, COUNT(*) AS total_ventas, SUM(total) AS monto_total
+        FROM public.ventas
+        GROUP BY 1
+    ) v ON v.fecha = d.fecha
+    LEFT JOIN (
+        SELECT x.fecha, jsonb_object_agg(x.metodo_pago, x.monto) AS metodos_pago
+        FROM (
+            SELECT fecha::DATE AS fecha, metodo_pago, SUM(monto) AS monto
+            FROM public.pagos
+            WHERE metodo_pago IS NOT NULL
+            GROUP BY 1, 2
+        ) x
+        GROUP BY x.fecha
+    ) p ON p.fecha = d.fecha
+    WHERE (p_desde IS NULL OR d.fecha >= p_desde)
+      AND (p_hasta IS NULL OR d.fecha <= p_hasta)
+    RETURNING *;
+$$;
@@ -17,4 +17,11 @@ BEGIN
         CREATE INDEX IF NOT EXISTS idx_carrito_cliente_id 
         ON public.carrito USING btree (cliente_id);
     END IF;
-END $$;
\ No newline at end of file
+END $$;
+
+-- Índices usados por la búsqueda del escáner (/productos/codigo/<codigo>)
+CREATE INDEX IF NOT EXISTS idx_productos_sku
+ON public.productos USING btree (sku);
+
+CREATE INDEX IF NOT EXISTS idx_productos_codigo_barras
+ON public.productos USING btree (codigo_barras);
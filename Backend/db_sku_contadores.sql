@@ -0,0 +1,47 @@
+-- Contador de SKU por prefijo (2 letras del nombre + 2 del color)
+CREATE TABLE IF NOT EXISTS public.sku_contadores (
+    prefijo TEXT PRIMARY KEY,
+    ultimo BIGINT NOT NULL DEFAULT 0
+);
+
+-- Reservar un bloque de p_cantidad números consecutivos para un prefijo
+-- Devuelve el primer número del bloque. Uso desde la API: supabase.rpc('reservar_skus', {...})
+CREATE OR REPLACE FUNCTION public.reservar_skus(p_prefijo TEXT, p_cantidad INTEGER DEFAULT 1)
+RETURNS TABLE (inicio BIGINT)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_ultimo BIGINT;
+BEGIN
+    -- Caso normal: el contador ya existe, el UPDATE bloquea la fila y serializa las reservas
+    UPDATE public.sku_contadores
+    SET ultimo = ultimo + p_cantidad
+    WHERE prefijo = p_prefijo
+    RETURNING ultimo INTO v_ultimo;
+
+    -- Primera reserva del prefijo: partir del mayor SKU existente en productos
+    IF NOT FOUND THEN
+        INSERT INTO public.sku_contadores (prefijo, ultimo)
+        SELECT p_prefijo, COALESCE(MAX(substring(p.sku FROM '(\d+)$')::BIGINT), 0) + p_cantidad
+        FROM public.productos p
+        WHERE p.sku LIKE p_prefijo || '%'
+        ON CONFLICT (prefijo) DO UPDATE SET ultimo = public.sku_contadores.ultimo + p_cantidad
+        RETURNING ultimo INTO v_ultimo;
+    END IF;
+
+    RETURN QUERY SELECT v_ultimo - p_cantidad + 1;
+END;
+$$;
+
+-- Guardar los SKUs asignados a varios productos con una sola sentencia (etiquetas de productos sin SKU)
+-- p_skus: [{"id": 1, "sku": "PUNE12"}, ...]. Uso desde la API: supabase.rpc('asignar_skus', {...})
+CREATE OR REPLACE FUNCTION public.asignar_skus(p_skus JSONB)
+RETURNS TABLE (producto_id INTEGER, sku TEXT)
+LANGUAGE sql
+AS $$
+    UPDATE public.productos p
+    SET sku = a.sku
+    FROM jsonb_to_recordset(p_skus) AS a(id INTEGER, sku TEXT)
+    WHERE p.id = a.id
+    RETURNING p.id, p.sku::TEXT;
+$$;
@@ -0,0 +1,130 @@
+-- Productos con stock bajo o agotados, mantenidos por trigger, con umbral por producto o categoría
+-- y un registro de transiciones (alertas_stock) que la API envía al dashboard por SSE
+
+-- Umbral propio del producto (NULL = usar el de su categoría)
+ALTER TABLE public.productos ADD COLUMN IF NOT EXISTS umbral_stock INTEGER;
+
+-- Umbral por categoría; la categoría '*' es el umbral general
+CREATE TABLE IF NOT EXISTS public.umbrales_stock_categoria (
+    categoria TEXT PRIMARY KEY,
+    umbral INTEGER NOT NULL CHECK (umbral >= 0)
+);
+
+INSERT INTO public.umbrales_stock_categoria (categoria, umbral)
+VALUES ('*', 10)
+ON CONFLICT (categoria) DO NOTHING;
+
+-- Conjunto actual de productos en stock bajo ('bajo') o sin stock ('agotado')
+CREATE TABLE IF NOT EXISTS public.stock_bajo (
+    producto_id BIGINT PRIMARY KEY REFERENCES public.productos (id) ON DELETE CASCADE,
+    estado TEXT NOT NULL,
+    stock INTEGER NOT NULL,
+    umbral INTEGER NOT NULL,
+    desde TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_bajo_estado ON public.stock_bajo USING btree (estado);
+
+-- Transiciones entre 'normal', 'bajo' y 'agotado'
+CREATE TABLE IF NOT EXISTS public.alertas_stock (
+    id BIGSERIAL PRIMARY KEY,
+    producto_id BIGINT NOT NULL,
+    nombre TEXT,
+    estado_anterior TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    stock INTEGER NOT NULL,
+    umbral INTEGER NOT NULL,
+    fecha TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Umbral efectivo: el del producto, el de su categoría o el general
+CREATE OR REPLACE FUNCTION public.umbral_stock(p_producto public.productos)
+RETURNS INTEGER
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(
+        p_producto.umbral_stock,
+        (SELECT u.umbral FROM public.umbrales_stock_categoria u WHERE u.categoria = to_jsonb(p_producto)->>'categoria'),
+        (SELECT u.umbral FROM public.umbrales_stock_categoria u WHERE u.categoria = '*'),
+        10
+    );
+$$;
+
+-- Actualiza stock_bajo para un producto y registra la transición si cambió de estado
+CREATE OR REPLACE FUNCTION public.evaluar_stock_bajo(p_producto public.productos)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_umbral INTEGER := public.umbral_stock(p_producto);
+    v_stock INTEGER := COALESCE(p_producto.stock, 0);
+    v_estado TEXT;
+    v_anterior TEXT;
+BEGIN
+    v_estado := CASE WHEN v_stock <= 0 THEN 'agotado' WHEN v_stock < v_umbral THEN 'bajo' ELSE 'normal' END;
+
+    SELECT s.estado INTO v_anterior FROM public.stock_bajo s WHERE s.producto_id = p_producto.id;
+    v_anterior := COALESCE(v_anterior, 'normal');
+
+    IF v_estado = 'normal' THEN
+        DELETE FROM public.stock_bajo WHERE producto_id = p_producto.id;
+    ELSE
+        INSERT INTO public.stock_bajo AS s (producto_id, estado, stock, umbral)
+        VALUES (p_producto.id, v_estado, v_stock, v_umbral)
+        ON CONFLICT (producto_id) DO UPDATE SET
+            estado = EXCLUDED.estado,
+            stock = EXCLUDED.stock,
+            umbral = EXCLUDED.umbral,
+            desde = CASE WHEN s.estado = EXCLUDED.estado THEN s.desde ELSE now() END;
+    END IF;
+
+    IF v_estado <> v_anterior THEN
+        INSERT INTO public.alertas_stock (producto_id, nombre, estado_anterior, estado, stock, umbral)
+        VALUES (p_producto.id, p_producto.nombre, v_anterior, v_estado, v_stock, v_umbral);
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.stock_bajo_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT'
+       OR OLD.stock IS DISTINCT FROM NEW.stock
+       OR OLD.umbral_stock IS DISTINCT FROM NEW.umbral_stock
+       OR to_jsonb(OLD)->'categoria' IS DISTINCT FROM to_jsonb(NEW)->'categoria' THEN
+        PERFORM public.evaluar_stock_bajo(NEW);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_stock_bajo ON public.productos;
+CREATE TRIGGER trg_stock_bajo
+AFTER INSERT OR UPDATE ON public.productos
+FOR EACH ROW EXECUTE FUNCTION public.stock_bajo_trigger();
+
+-- Reevaluar los productos de una categoría (o todos con NULL o '*') tras cambiar su umbral
+-- Uso desde la API: supabase.rpc('recalcular_stock_bajo', {'p_categoria': 'Mujer'})
+CREATE OR REPLACE FUNCTION public.recalcular_stock_bajo(p_categoria TEXT DEFAULT NULL)
+RETURNS TABLE (evaluados INTEGER)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_producto public.productos;
+    v_total INTEGER := 0;
+BEGIN
+    FOR v_producto IN
+        SELECT * FROM public.productos p
+        WHERE p_categoria IS NULL OR p_categoria = '*' OR to_jsonb(p)->>'categoria' = p_categoria
+    LOOP
+        PERFORM public.evaluar_stock_bajo(v_producto);
+        v_total := v_total + 1;
+    END LOOP;
+    RETURN QUERY SELECT v_total;
+END;
+$$;
+
+SELECT * FROM public.recalcular_stock_bajo();
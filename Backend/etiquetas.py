@@ -0,0 +1,141 @@
+#Propósito: Renderizado de hojas de etiquetas (QR + Code128) en un pool de procesos con cache de imágenes.
+
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from io import BytesIO
+from PIL import Image, ImageDraw, ImageFont
+import barcode
+from barcode.errors import BarcodeError
+from barcode.writer import ImageWriter
+import qrcode
+import hashlib
+import json
+import os
+import threading
+
+# Cada worker de gunicorn tiene su propio pool: por defecto las CPUs se reparten entre los workers
+ETIQUETAS_PROCESOS = int(os.environ.get('ETIQUETAS_PROCESOS', max(1, (os.cpu_count() or 1) // int(os.environ.get('WEB_CONCURRENCY', 2)))))
+ETIQUETAS_CACHE_MAX = int(os.environ.get('ETIQUETAS_CACHE_MAX', 5000))
+
+# Hoja carta a 200 DPI con 3 x 8 etiquetas
+DPI = 200
+ANCHO_HOJA, ALTO_HOJA = 1700, 2200
+MARGEN = 60
+COLUMNAS, FILAS = 3, 8
+ANCHO_ETIQUETA = (ANCHO_HOJA - 2 * MARGEN) // COLUMNAS
+ALTO_ETIQUETA = (ALTO_HOJA - 2 * MARGEN) // FILAS
+POR_HOJA = COLUMNAS * FILAS
+
+_lock = threading.Lock()
+_pool = None
+_pid_pool = None
+_cache = OrderedDict()  # clave de la etiqueta -> PNG
+
+
+def renderizar_etiqueta(etiqueta):
+    # Se ejecuta en los procesos del pool: dibuja QR, código de barras y textos en un PNG.
+    # None si el SKU no se puede codificar en Code128 (caracteres fuera de Latin-1)
+    try:
+        codigo = barcode.Code128(etiqueta['barcode'], writer=ImageWriter())
+    except BarcodeError:
+        return None
+
+    lienzo = Image.new('RGB', (ANCHO_ETIQUETA, ALTO_ETIQUETA), 'white')
+    fuente = ImageFont.load_default()
+    alto_codigos = ALTO_ETIQUETA - 40
+
+    qr = qrcode.QRCode(border=1, box_size=4, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(etiqueta['qr_code'])
+    qr.make(fit=True)
+    imagen_qr = qr.make_image(fill_color='black', back_color='white').convert('RGB')
+    lado_qr = min(alto_codigos, ANCHO_ETIQUETA // 2) - 10
+    imagen_qr = imagen_qr.resize((lado_qr, lado_qr), Image.NEAREST)
+    lienzo.paste(imagen_qr, (5, 5))
+
+    imagen_barras = codigo.render({'write_text': False, 'module_height': 8, 'quiet_zone': 1, 'dpi': DPI})
+    ancho_barras = ANCHO_ETIQUETA - lado_qr - 20
+    imagen_barras = imagen_barras.convert('RGB').resize((ancho_barras, alto_codigos // 2), Image.NEAREST)
+    lienzo.paste(imagen_barras, (lado_qr + 15, 5))
+
+    dibujo = ImageDraw.Draw(lienzo)
+    dibujo.text((lado_qr + 15, alto_codigos // 2 + 15), etiqueta['sku'], fill='black', font=fuente)
+    dibujo.text((5, alto_codigos + 5), str(etiqueta['nombre'])[:40], fill='black', font=fuente)
+    dibujo.text((5, alto_codigos + 20), f"${etiqueta['precio']}  {etiqueta.get('color') or ''}", fill='black', font=fuente)
+
+    salida = BytesIO()
+    lienzo.save(salida, format='PNG')
+    return salida.getvalue()
+
+
+def _obtener_pool():
+    global _pool, _pid_pool
+    # Un pool por proceso de gunicorn, creado al primer uso
+    with _lock:
+        if _pool is None or _pid_pool != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=ETIQUETAS_PROCESOS)
+            _pid_pool = os.getpid()
+        return _pool
+
+
+def _clave(etiqueta):
+    # Cambia solo si cambia algo impreso en la etiqueta (SKU, precio, nombre...)
+    contenido = json.dumps(etiqueta, sort_keys=True, default=str).encode()
+    return (etiqueta['sku'], hashlib.sha1(contenido).hexdigest())
+
+
+def renderizar_etiquetas(etiquetas):
+    # Devuelve los PNG de cada etiqueta (None si no se pudo dibujar); solo se renderizan las que no están en cache.
+    # Con workers gevent el map espera los resultados del pool sin bloquear el hub (test_render_con_gevent)
+    claves = [_clave(etiqueta) for etiqueta in etiquetas]
+    # Las encontradas se copian ahora: otra solicitud puede expulsarlas de la cache mientras se renderiza
+    en_cache = {}
+    pendientes = {}
+    with _lock:
+        for clave, etiqueta in zip(claves, etiquetas):
+            if clave in _cache:
+                _cache.move_to_end(clave)
+                en_cache[clave] = _cache[clave]
+            else:
+                pendientes[clave] = etiqueta
+
+    if pendientes:
+        lote = list(pendientes.items())
+        tamano_bloque = max(1, len(lote) // (ETIQUETAS_PROCESOS * 4))
+        imagenes = _obtener_pool().map(renderizar_etiqueta, [e for _, e in lote], chunksize=tamano_bloque)
+        nuevas = dict(zip([c for c, _ in lote], imagenes))
+    else:
+        nuevas = {}
+
+    with _lock:
+        _cache.update(nuevas)
+        while len(_cache) > ETIQUETAS_CACHE_MAX:
+            _cache.popitem(last=False)
+    return [en_cache[clave] if clave in en_cache else nuevas[clave] for clave in claves]
+
+
+def generar_hojas(etiquetas):
+    # Acomoda las etiquetas en hojas de COLUMNAS x FILAS; devuelve las hojas y las etiquetas omitidas
+    renderizadas = list(zip(etiquetas, renderizar_etiquetas(etiquetas)))
+    omitidas = [etiqueta for etiqueta, png in renderizadas if png is None]
+    imagenes = [png for _, png in renderizadas if png is not None]
+    hojas = []
+    for inicio in range(0, len(imagenes), POR_HOJA):
+        hoja = Image.new('RGB', (ANCHO_HOJA, ALTO_HOJA), 'white')
+        for posicion, png in enumerate(imagenes[inicio:inicio + POR_HOJA]):
+            fila, columna = divmod(posicion, COLUMNAS)
+            hoja.paste(Image.open(BytesIO(png)), (MARGEN + columna * ANCHO_ETIQUETA, MARGEN + fila * ALTO_ETIQUETA))
+        # Blanco y negro: PDF/PNG mucho más ligeros y rápidos de codificar
+        hojas.append(hoja.convert('1'))
+    return hojas, omitidas
+
+
+def hojas_a_pdf(hojas):
+    salida = BytesIO()
+    hojas[0].save(salida, format='PDF', resolution=DPI, save_all=True, append_images=hojas[1:])
+    return salida.getvalue()
+
+
+def hoja_a_png(hoja):
+    salida = BytesIO()
+    hoja.save(salida, format='PNG', dpi=(DPI, DPI))
+    return salida.getvalue()
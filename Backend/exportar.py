@@ -0,0 +1,107 @@
+#Propósito: Exportación completa de tablas en CSV o NDJSON, leída por bloques y enviada en streaming.
+
+from flask import Response, request, jsonify
+from db import supabase
+import csv
+import io
+import itertools
+import json
+import os
+
+EXPORTAR_BLOQUE = int(os.environ.get('EXPORTAR_BLOQUE', 1000))
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def leer_por_bloques(tabla, filtros=None, columnas='*', bloque=None):
+    # Recorre la tabla por id ascendente (keyset): cada bloque es una consulta indexada
+    # y solo un bloque vive en memoria a la vez. Termina con un bloque vacío: PostgREST
+    # puede devolver menos filas que el límite (max-rows) aunque queden más
+    bloque = bloque or EXPORTAR_BLOQUE
+    ultimo_id = None
+    while True:
+        query = supabase.table(tabla).select(columnas)
+        if filtros:
+            query = filtros(query)
+        if ultimo_id is not None:
+            query = query.gt('id', ultimo_id)
+        filas = query.order('id').limit(bloque).execute().data
+        if not filas:
+            return
+        yield from filas
+        ultimo_id = filas[-1]['id']
+
+
+def _valor_csv(valor):
+    # Objetos anidados (jsonb) como JSON; None como celda vacía
+    if valor is None:
+        return ''
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, ensure_ascii=False, default=str)
+    return valor
+
+
+def _generar_csv(filas):
+    buffer = io.StringIO()
+    escritor = None
+    for fila in filas:
+        if escritor is None:
+            # Las columnas se toman de la primera fila
+            escritor = csv.DictWriter(buffer, fieldnames=list(fila.keys()), extrasaction='ignore')
+            escritor.writeheader()
+        escritor.writerow({clave: _valor_csv(valor) for clave, valor in fila.items()})
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _generar_ndjson(filas):
+    lineas = []
+    for fila in filas:
+        lineas.append(json.dumps(fila, ensure_ascii=False, default=str))
+        if len(lineas) >= 500:
+            yield '\n'.join(lineas) + '\n'
+            lineas = []
+    if lineas:
+        yield '\n'.join(lineas) + '\n'
+
+
+def respuesta_exportacion(tabla, filtros=None, nombre=None):
+    # ?formato=csv|ndjson (por defecto csv); la respuesta se escribe mientras se leen los bloques
+    formato = request.args.get('formato', 'csv').lower()
+    if formato not in FORMATOS:
+        return jsonify({"error": f"Formato no soportado: {formato}. Use csv o ndjson"}), 400
+
+    tipo, extension = FORMATOS[formato]
+    filas = leer_por_bloques(tabla, filtros)
+    # El primer bloque se lee antes de responder: un filtro inválido o un error de Supabase
+    # sale como error JSON de la ruta y no como un 200 con el archivo vacío o cortado
+    primera = next(filas, None)
+    filas = itertools.chain([primera], filas) if primera is not None else iter(())
+    generador = _generar_csv(filas) if formato == 'csv' else _generar_ndjson(filas)
+
+    respuesta = Response(generador, mimetype=tipo)
+    respuesta.headers['Content-Disposition'] = f'attachment; filename="{nombre or tabla}.{extension}"'
+    # Evitar que un proxy acumule toda la respuesta antes de enviarla
+    respuesta.headers['X-Accel-Buffering'] = 'no'
+    return respuesta
+
+
+def filtro_fechas(fecha_desde=None, fecha_hasta=None, **igualdades):
+    # Construye la función de filtros comunes a las exportaciones
+    def aplicar(query):
+        if fecha_desde:
+            query = query.gte('fecha', fecha_desde)
+        if fecha_hasta:
+            query = query.lte('fecha', fecha_hasta)
+        for campo, valor in igualdades.items():
+            if valor is not None:
+                query = query.eq(campo, valor)
+        return query
+    return aplicar
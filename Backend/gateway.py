@@ -5,14 +5,6 @@ import os
 # Cargar variables de entorno desde el archivo .env
 load_dotenv()
 
-from flask import Flask
-from flask_cors import CORS
-from productos import productos_bp
-from carrito import carrito_bp
-from inventario import inventario_bp
-from pagos import pagos_bp
-from ventas import ventas_bp
-from usuarios import usuarios_bp
 from flask import Blueprint, jsonify
 
 # Crear el blueprint en lugar de una app independiente
@@ -0,0 +1,19 @@
+#Propósito: Configuración de gunicorn: workers gevent para atender muchas solicitudes simultáneas por proceso.
+
+import os
+import shutil
+import tempfile
+
+# Con gevent cada solicitud es un greenlet: mientras espera a Supabase el proceso atiende otras
+# GUNICORN_WORKER_CLASS=sync|gthread vuelve al modo anterior (una solicitud por worker/hilo)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_connections = int(os.environ.get('GUNICORN_CONEXIONES', 500))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+
+def on_starting(server):
+    # Las métricas de una ejecución anterior no se suman a las nuevas (ver metricas.py)
+    shutil.rmtree(os.environ.get('METRICAS_DIR', os.path.join(tempfile.gettempdir(), 'karma_metricas')), ignore_errors=True)
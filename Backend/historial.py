@@ -0,0 +1,201 @@
+#Propósito: Escritura diferida del historial de inventario en lotes, con cola local en SQLite si Supabase falla.
+
+from db import supabase, CODIGOS_TABLA_NO_DISPONIBLE
+from postgrest.exceptions import APIError
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+HISTORIAL_LOTE = int(os.environ.get('HISTORIAL_LOTE', 200))
+HISTORIAL_INTERVALO = float(os.environ.get('HISTORIAL_INTERVALO', 2))
+HISTORIAL_REINTENTO = float(os.environ.get('HISTORIAL_REINTENTO', 30))
+HISTORIAL_SPOOL = os.environ.get('HISTORIAL_SPOOL', os.path.join(tempfile.gettempdir(), 'karma_historial.sqlite3'))
+
+# SQLSTATE de datos inválidos (22) o restricciones violadas (23): la fila nunca se aceptará
+_CLASES_RECHAZO = ('22', '23')
+
+
+def _es_rechazo(error):
+    # Supabase respondió y rechazó las filas: reintentar no sirve. Cualquier otra falla (sin código,
+    # como un 5xx del gateway con cuerpo JSON, PGRST0xx de conexión, recursos) se reintenta
+    if not isinstance(error, APIError):
+        return False
+    codigo = str(error.code or '')
+    if codigo.startswith('PGRST'):
+        # PGRST1xx-3xx: solicitud inválida (4xx); PGRST0xx: PostgREST no llegó a la base
+        return not codigo.startswith('PGRST0')
+    return codigo.startswith(_CLASES_RECHAZO)
+
+
+class EscritorHistorial:
+    # Las filas se encolan en memoria y un hilo las inserta en lotes (por tamaño o por tiempo);
+    # si el insert falla se guardan en un archivo SQLite y se reenvían más tarde
+
+    def __init__(self, tabla='historial_inventario', lote=HISTORIAL_LOTE, intervalo=HISTORIAL_INTERVALO,
+                 reintento=HISTORIAL_REINTENTO, ruta_spool=HISTORIAL_SPOOL):
+        self.tabla = tabla
+        self.lote = lote
+        self.intervalo = intervalo
+        self.reintento = reintento
+        self.ruta_spool = ruta_spool
+        self._lock = threading.Lock()
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._pid_hilo = None
+        self._detener = threading.Event()
+        self._atexit_registrado = False
+        self._proximo_reintento = 0
+        # Un spool que quedó de una ejecución anterior se reenvía al arrancar
+        self._spool_pendiente = os.path.exists(ruta_spool)
+
+    def registrar(self, filas):
+        # No bloquea: la solicitud continúa mientras el hilo escribe
+        if isinstance(filas, dict):
+            filas = [filas]
+        if not filas:
+            return
+        self._asegurar_hilo()
+        for fila in filas:
+            self._cola.put(fila)
+
+    def _asegurar_hilo(self):
+        # Un hilo por proceso de gunicorn, creado al primer uso
+        pid = os.getpid()
+        if self._hilo is None or self._pid_hilo != pid or not self._hilo.is_alive():
+            with self._lock:
+                if self._hilo is None or self._pid_hilo != pid or not self._hilo.is_alive():
+                    if self._pid_hilo != pid:
+                        self._cola = queue.Queue()
+                    self._detener.clear()
+                    self._hilo = threading.Thread(target=self._bucle, name='historial', daemon=True)
+                    self._pid_hilo = pid
+                    self._hilo.start()
+                    if not self._atexit_registrado:
+                        atexit.register(self.vaciar)
+                        self._atexit_registrado = True
+
+    def _tomar_lote(self):
+        # Espera hasta completar un lote o hasta que pase el intervalo
+        filas = []
+        limite = time.monotonic() + self.intervalo
+        while len(filas) < self.lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                filas.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return filas
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                filas = self._tomar_lote()
+                if filas:
+                    self._escribir(filas)
+                if self._spool_pendiente and time.monotonic() >= self._proximo_reintento:
+                    self.reenviar_spool()
+            except Exception as e:
+                log.error("Error en el escritor de historial: %s", e)
+
+    def _escribir(self, filas):
+        try:
+            supabase.table(self.tabla).insert(filas).execute()
+        except Exception as e:
+            if isinstance(e, APIError) and e.code in CODIGOS_TABLA_NO_DISPONIBLE:
+                # Si la tabla no existe, continuamos sin registrar historial
+                log.error("Error al registrar historial: %s", e)
+                return
+            log.warning("Error al registrar historial (%s filas), se guardan para reintentar: %s", len(filas), e)
+            self._guardar_spool(filas)
+
+    def _conectar_spool(self):
+        conexion = sqlite3.connect(self.ruta_spool, timeout=30, isolation_level=None)
+        conexion.execute('CREATE TABLE IF NOT EXISTS pendientes (id INTEGER PRIMARY KEY AUTOINCREMENT, tabla TEXT NOT NULL, fila TEXT NOT NULL)')
+        # Filas que Supabase rechazó al reenviarlas: se conservan para revisarlas a mano
+        conexion.execute('CREATE TABLE IF NOT EXISTS descartadas (id INTEGER PRIMARY KEY AUTOINCREMENT, tabla TEXT NOT NULL, fila TEXT NOT NULL, error TEXT)')
+        return conexion
+
+    def _guardar_spool(self, filas):
+        conexion = self._conectar_spool()
+        try:
+            conexion.executemany('INSERT INTO pendientes (tabla, fila) VALUES (?, ?)',
+                                 [(self.tabla, json.dumps(fila, default=str)) for fila in filas])
+        finally:
+            conexion.close()
+        self._spool_pendiente = True
+        self._proximo_reintento = time.monotonic() + self.reintento
+
+    def reenviar_spool(self):
+        # Reenvía el spool por lotes; el bloqueo de escritura de SQLite evita que dos
+        # procesos reenvíen las mismas filas. Devuelve cuántas filas se insertaron
+        if not os.path.exists(self.ruta_spool):
+            self._spool_pendiente = False
+            return 0
+        enviadas = 0
+        conexion = self._conectar_spool()
+        try:
+            while True:
+                conexion.execute('BEGIN IMMEDIATE')
+                pendientes = conexion.execute('SELECT id, fila FROM pendientes WHERE tabla = ? ORDER BY id LIMIT ?',
+                                              (self.tabla, self.lote)).fetchall()
+                if not pendientes:
+                    conexion.execute('COMMIT')
+                    self._spool_pendiente = False
+                    return enviadas
+                try:
+                    supabase.table(self.tabla).insert([json.loads(fila) for _, fila in pendientes]).execute()
+                    enviadas += len(pendientes)
+                except Exception as e:
+                    if not _es_rechazo(e):
+                        conexion.execute('ROLLBACK')
+                        log.warning("Supabase sigue sin aceptar el historial pendiente: %s", e)
+                        self._proximo_reintento = time.monotonic() + self.reintento
+                        return enviadas
+                    # El lote fue rechazado: enviar fila por fila y apartar las que fallen
+                    enviadas += self._reenviar_por_fila(conexion, pendientes)
+                conexion.execute('DELETE FROM pendientes WHERE tabla = ? AND id <= ?', (self.tabla, pendientes[-1][0]))
+                conexion.execute('COMMIT')
+        finally:
+            conexion.close()
+
+    def _reenviar_por_fila(self, conexion, pendientes):
+        enviadas = 0
+        for _, fila in pendientes:
+            try:
+                supabase.table(self.tabla).insert(json.loads(fila)).execute()
+                enviadas += 1
+            except Exception as e:
+                if not _es_rechazo(e):
+                    raise
+                log.warning("Fila de historial rechazada, se aparta en el spool: %s", e)
+                conexion.execute('INSERT INTO descartadas (tabla, fila, error) VALUES (?, ?, ?)', (self.tabla, fila, str(e)))
+        return enviadas
+
+    def vaciar(self):
+        # Detiene el hilo y escribe lo que quede en la cola (al terminar el proceso o en pruebas);
+        # el siguiente registrar() vuelve a arrancar el hilo
+        hilo = self._hilo
+        self._detener.set()
+        if hilo is not None and hilo.is_alive() and self._pid_hilo == os.getpid():
+            hilo.join(self.intervalo + 5)
+        filas = []
+        while True:
+            try:
+                filas.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        for inicio in range(0, len(filas), self.lote):
+            self._escribir(filas[inicio:inicio + self.lote])
+
+
+escritor_historial = EscritorHistorial()
@@ -0,0 +1,205 @@
+#Propósito: Métricas por endpoint (latencia, llamadas a Supabase, bytes y tiempo upstream) en formato Prometheus.
+
+from flask import request, g, Response
+import db
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Cada worker de gunicorn guarda sus contadores en este directorio; /metrics suma los de todos
+METRICAS_DIR = os.environ.get('METRICAS_DIR', os.path.join(tempfile.gettempdir(), 'karma_metricas'))
+METRICAS_INTERVALO = float(os.environ.get('METRICAS_INTERVALO', 5))
+# Si se define, /metrics exige "Authorization: Bearer <METRICAS_TOKEN>"
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _histograma():
+    return {"conteo": 0, "suma": 0.0, "buckets": [0] * len(BUCKETS)}
+
+
+def _observar(histograma, valor):
+    histograma["conteo"] += 1
+    histograma["suma"] += valor
+    for indice, limite in enumerate(BUCKETS):
+        if valor <= limite:
+            histograma["buckets"][indice] += 1
+
+
+def _sumar_histograma(destino, origen):
+    destino["conteo"] += origen["conteo"]
+    destino["suma"] += origen["suma"]
+    destino["buckets"] = [a + b for a, b in zip(destino["buckets"], origen["buckets"])]
+
+
+class Metricas:
+    # Contadores del proceso; las claves son JSON ([endpoint, método, estado]) para poder guardarlas en archivo
+
+    def __init__(self, directorio=METRICAS_DIR, intervalo=METRICAS_INTERVALO):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._solicitudes = {}
+        self._upstream = {}
+        self._hilo = None
+        self._pid_hilo = None
+
+    def registrar(self, endpoint, metodo, estado, segundos, llamadas):
+        with self._lock:
+            clave = json.dumps([endpoint, metodo, str(estado)])
+            _observar(self._solicitudes.setdefault(clave, _histograma()), segundos)
+            upstream = self._upstream.setdefault(endpoint, dict(_histograma(), llamadas=0, bytes=0))
+            _observar(upstream, llamadas["segundos"])
+            upstream["llamadas"] += llamadas["llamadas"]
+            upstream["bytes"] += llamadas["bytes"]
+        self._asegurar_hilo()
+
+    def instantanea(self):
+        with self._lock:
+            return {
+                "solicitudes": json.loads(json.dumps(self._solicitudes)),
+                "upstream": json.loads(json.dumps(self._upstream)),
+                "tablas": db.estadisticas(),
+            }
+
+    def _asegurar_hilo(self):
+        # Un hilo por proceso guarda la instantánea cada intervalo para que otros workers la lean
+        pid = os.getpid()
+        if self._hilo is None or self._pid_hilo != pid or not self._hilo.is_alive():
+            with self._lock:
+                if self._hilo is None or self._pid_hilo != pid or not self._hilo.is_alive():
+                    if self._pid_hilo is None:
+                        atexit.register(self.guardar)
+                    elif self._pid_hilo != pid:
+                        # Proceso hijo: no arrastra los contadores del padre
+                        self._solicitudes, self._upstream = {}, {}
+                    self._hilo = threading.Thread(target=self._bucle, name='metricas', daemon=True)
+                    self._pid_hilo = pid
+                    self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self.guardar()
+            except Exception as e:
+                log.error("Error al guardar métricas: %s", e)
+
+    def guardar(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = os.path.join(self.directorio, f"{os.getpid()}.json")
+        with open(ruta + '.tmp', 'w') as archivo:
+            json.dump(self.instantanea(), archivo)
+        os.replace(ruta + '.tmp', ruta)
+
+    def combinadas(self):
+        # Este proceso en memoria más la última instantánea de los demás (incluidos workers ya terminados)
+        instantaneas = [self.instantanea()]
+        propio = f"{os.getpid()}.json"
+        if os.path.isdir(self.directorio):
+            for nombre in os.listdir(self.directorio):
+                if nombre.endswith('.json') and nombre != propio:
+                    try:
+                        with open(os.path.join(self.directorio, nombre)) as archivo:
+                            instantaneas.append(json.load(archivo))
+                    except (OSError, ValueError):
+                        continue
+        total = {"solicitudes": {}, "upstream": {}, "tablas": {}}
+        for instantanea in instantaneas:
+            for clave, histograma in instantanea["solicitudes"].items():
+                _sumar_histograma(total["solicitudes"].setdefault(clave, _histograma()), histograma)
+            for endpoint, upstream in instantanea["upstream"].items():
+                destino = total["upstream"].setdefault(endpoint, dict(_histograma(), llamadas=0, bytes=0))
+                _sumar_histograma(destino, upstream)
+                destino["llamadas"] += upstream["llamadas"]
+                destino["bytes"] += upstream["bytes"]
+            for tabla, stats in instantanea["tablas"].items():
+                destino = total["tablas"].setdefault(tabla, {"llamadas": 0, "bytes": 0, "segundos": 0.0, "errores": 0})
+                for campo in destino:
+                    destino[campo] += stats.get(campo, 0)
+        return total
+
+    def texto_prometheus(self):
+        datos = self.combinadas()
+        lineas = []
+
+        def etiquetas(**valores):
+            return ','.join(f'{k}="{str(v)}"' for k, v in valores.items())
+
+        def histograma(nombre, h, **valores):
+            base = etiquetas(**valores)
+            for limite, acumulado in zip(BUCKETS, h["buckets"]):
+                lineas.append(f'{nombre}_bucket{{{base},le="{limite}"}} {acumulado}')
+            lineas.append(f'{nombre}_bucket{{{base},le="+Inf"}} {h["conteo"]}')
+            lineas.append(f'{nombre}_sum{{{base}}} {h["suma"]}')
+            lineas.append(f'{nombre}_count{{{base}}} {h["conteo"]}')
+
+        lineas.append('# HELP karma_http_solicitud_segundos Latencia de las solicitudes por endpoint')
+        lineas.append('# TYPE karma_http_solicitud_segundos histogram')
+        for clave, h in sorted(datos["solicitudes"].items()):
+            endpoint, metodo, estado = json.loads(clave)
+            histograma('karma_http_solicitud_segundos', h, endpoint=endpoint, metodo=metodo, estado=estado)
+
+        lineas.append('# HELP karma_supabase_solicitud_segundos Tiempo esperando a Supabase por solicitud (suma de llamadas)')
+        lineas.append('# TYPE karma_supabase_solicitud_segundos histogram')
+        for endpoint, h in sorted(datos["upstream"].items()):
+            histograma('karma_supabase_solicitud_segundos', h, endpoint=endpoint)
+
+        for campo, ayuda in (("llamadas", "Llamadas a Supabase"), ("bytes", "Bytes recibidos de Supabase")):
+            nombre = f'karma_supabase_solicitud_{campo}_total'
+            lineas.append(f'# HELP {nombre} {ayuda} por endpoint')
+            lineas.append(f'# TYPE {nombre} counter')
+            for endpoint, h in sorted(datos["upstream"].items()):
+                lineas.append(f'{nombre}{{{etiquetas(endpoint=endpoint)}}} {h[campo]}')
+
+        for campo, ayuda in (("llamadas", "Llamadas"), ("bytes", "Bytes recibidos"), ("segundos", "Segundos"), ("errores", "Errores")):
+            nombre = f'karma_supabase_tabla_{campo}_total'
+            lineas.append(f'# HELP {nombre} {ayuda} a Supabase por tabla o RPC')
+            lineas.append(f'# TYPE {nombre} counter')
+            for tabla, stats in sorted(datos["tablas"].items()):
+                lineas.append(f'{nombre}{{{etiquetas(tabla=tabla)}}} {stats[campo]}')
+        return '\n'.join(lineas) + '\n'
+
+
+metricas = Metricas()
+
+
+def _iniciar():
+    g.metricas_inicio = time.perf_counter()
+    g.metricas_llamadas, g.metricas_token = db.medir_solicitud()
+
+
+def _registrar(response):
+    inicio = g.pop('metricas_inicio', None)
+    if inicio is None or request.endpoint == 'metricas':
+        return response
+    # Endpoint del blueprint (p. ej. ventas.crear_venta) para no crear una serie por cada URL
+    metricas.registrar(request.endpoint or 'sin_ruta', request.method, response.status_code,
+                       time.perf_counter() - inicio, g.metricas_llamadas)
+    return response
+
+
+def _terminar(error=None):
+    token = g.pop('metricas_token', None)
+    if token is not None:
+        db.terminar_medicion(token)
+
+
+def configurar(app):
+    # Registrar antes que la autenticación para medir también las solicitudes rechazadas
+    app.before_request(_iniciar)
+    app.after_request(_registrar)
+    app.teardown_request(_terminar)
+
+    @app.route('/metrics', endpoint='metricas')
+    def exportar_metricas():
+        if METRICAS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICAS_TOKEN}':
+            return Response('No autorizado\n', status=401, mimetype='text/plain')
+        return Response(metricas.texto_prometheus(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,484 @@
+#Propósito: Sustituto en memoria de la API PostgREST de Supabase para pruebas y benchmarks sin red.
+
+import datetime
+import db
+import httpx
+import json
+import re
+import threading
+import time
+
+# Columnas que forman la clave primaria de cada tabla (para upsert); el resto usa 'id'
+CLAVES = {
+    'umbrales_stock_categoria': ('categoria',),
+    'stock_bajo': ('producto_id',),
+    'carrito_resumen': ('vendedor_id',),
+    'ventas_resumen_diario': ('fecha',),
+    'sku_contadores': ('prefijo',),
+}
+
+# Claves foráneas con on delete CASCADE de squema.sql: tabla borrada -> (tabla hija, columna)
+CASCADAS = {
+    'productos': (('carrito', 'producto_id'),),
+    'ventas': (('pagos', 'venta_id'),),
+}
+
+_PARAMETROS_RESERVADOS = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+
+
+class _ErrorPostgrest(Exception):
+    def __init__(self, estado, codigo, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.codigo = codigo
+        self.mensaje = mensaje
+
+
+def _dividir(texto, separador=','):
+    # Divide en el nivel superior, respetando paréntesis y valores entre comillas
+    partes, actual, nivel, comillas = [], '', 0, False
+    for caracter in texto:
+        if caracter == '"':
+            comillas = not comillas
+        elif not comillas and caracter == '(':
+            nivel += 1
+        elif not comillas and caracter == ')':
+            nivel -= 1
+        elif not comillas and nivel == 0 and caracter == separador:
+            partes.append(actual.strip())
+            actual = ''
+            continue
+        actual += caracter
+    if actual.strip():
+        partes.append(actual.strip())
+    return partes
+
+
+def _sin_comillas(valor):
+    if len(valor) >= 2 and valor[0] == valor[-1] == '"':
+        return valor[1:-1].replace('\\"', '"')
+    return valor
+
+
+def _convertir(valor, referencia):
+    # Los filtros llegan como texto: se comparan con el tipo de la columna
+    if valor == 'null':
+        return None
+    if isinstance(referencia, bool):
+        return valor == 'true'
+    if isinstance(referencia, (int, float)):
+        try:
+            return float(valor) if '.' in valor else int(valor)
+        except ValueError:
+            return valor
+    return valor
+
+
+def _comparar(operador, actual, valor):
+    if operador == 'is':
+        return actual is None if valor in ('null', None) else actual is _convertir(valor, True)
+    if operador in ('like', 'ilike'):
+        if actual is None:
+            return False
+        patron = '^' + ''.join('.*' if c in '%*' else '.' if c == '_' else re.escape(c) for c in valor) + '$'
+        return re.match(patron, str(actual), re.IGNORECASE if operador == 'ilike' else 0) is not None
+    valor = _convertir(valor, actual)
+    if operador == 'eq':
+        return actual == valor
+    if operador == 'neq':
+        return actual != valor
+    if actual is None or valor is None:
+        return False
+    try:
+        return {'gt': actual > valor, 'gte': actual >= valor, 'lt': actual < valor, 'lte': actual <= valor}[operador]
+    except KeyError:
+        raise _ErrorPostgrest(400, 'PGRST100', f'Operador no soportado: {operador}')
+    except TypeError:
+        return {'gt': str(actual) > str(valor), 'gte': str(actual) >= str(valor),
+                'lt': str(actual) < str(valor), 'lte': str(actual) <= str(valor)}[operador]
+
+
+def _condicion(columna, expresion):
+    # 'eq.5', 'not.in.(1,2)', 'like.JOY-%'
+    negar = expresion.startswith('not.')
+    if negar:
+        expresion = expresion[4:]
+    operador, _, valor = expresion.partition('.')
+    # La lista de in.(...) se interpreta una vez y se convierte al tipo de la columna una vez por tipo
+    valores = [_sin_comillas(v) for v in _dividir(valor.strip('()'))] if operador == 'in' else None
+    convertidos = {}
+
+    def evaluar(fila):
+        actual = fila.get(columna)
+        if valores is not None:
+            if type(actual) not in convertidos:
+                convertidos[type(actual)] = {_convertir(v, actual) for v in valores}
+            resultado = actual in convertidos[type(actual)]
+        else:
+            resultado = _comparar(operador, actual, _sin_comillas(valor))
+        return not resultado if negar else resultado
+    return evaluar
+
+
+def _condicion_logica(operador, texto):
+    # or=(a.eq.1,and(b.lt.2,c.gt.3))
+    condiciones = []
+    for parte in _dividir(texto.strip()[1:-1]):
+        if parte.startswith(('and(', 'or(')):
+            interno, _, resto = parte.partition('(')
+            condiciones.append(_condicion_logica(interno, '(' + resto))
+        else:
+            columna, _, expresion = parte.partition('.')
+            condiciones.append(_condicion(columna, expresion))
+    combinar = any if operador == 'or' else all
+    return lambda fila: combinar(c(fila) for c in condiciones)
+
+
+def _singular(tabla):
+    return tabla[:-1] if tabla.endswith('s') else tabla
+
+
+class PostgrestMemoria:
+    # Tablas en diccionarios; atiende las peticiones HTTP del cliente de Supabase con un MockTransport.
+    # Las RPC no registradas responden PGRST202, así los blueprints usan su camino en Python;
+    # disparadores emula los triggers por tabla: función(memoria, anterior, nueva) tras cada cambio
+
+    def __init__(self, tablas=None, latencia=0.0, rpcs=None, disparadores=None):
+        self.tablas = {nombre: [dict(fila) for fila in filas] for nombre, filas in (tablas or {}).items()}
+        self.latencia = latencia
+        self.rpcs = dict(rpcs or {})
+        self.disparadores = dict(disparadores or {})
+        self.llamadas = []
+        # (tabla, select) de cada lectura, para verificar qué columnas pide cada ruta
+        self.selects = []
+        self._lock = threading.RLock()
+        self._secuencias = {}
+        self._indices = {}
+
+    def cliente(self):
+        # Cliente de Supabase igual al de producción (sesión instrumentada) pero sin red
+        return db.crear_cliente(httpx.MockTransport(self._atender))
+
+    def _siguiente_id(self, tabla):
+        filas = self.tablas[tabla]
+        actual = self._secuencias.get(tabla)
+        if actual is None:
+            actual = max((f['id'] for f in filas if isinstance(f.get('id'), int)), default=0)
+        self._secuencias[tabla] = actual + 1
+        return actual + 1
+
+    def _atender(self, request):
+        if self.latencia:
+            time.sleep(self.latencia)
+        partes = request.url.path.split('/rest/v1/', 1)[-1].strip('/').split('/')
+        self.llamadas.append((request.method, '/'.join(partes)))
+        try:
+            with self._lock:
+                if partes[0] == 'rpc':
+                    return self._rpc(partes[1], json.loads(request.content or b'{}'))
+                return self._tabla(request, partes[0])
+        except _ErrorPostgrest as e:
+            return httpx.Response(e.estado, json={'code': e.codigo, 'message': e.mensaje, 'details': None, 'hint': None})
+
+    def _rpc(self, funcion, parametros):
+        if funcion not in self.rpcs:
+            raise _ErrorPostgrest(404, 'PGRST202', f'Could not find the function public.{funcion}')
+        return httpx.Response(200, json=self.rpcs[funcion](self, parametros))
+
+    def _tabla(self, request, tabla):
+        if tabla not in self.tablas:
+            raise _ErrorPostgrest(404, '42P01', f'relation "public.{tabla}" does not exist')
+        parametros = request.url.params
+        filtros = []
+        for clave, valor in parametros.multi_items():
+            if clave in ('or', 'and'):
+                filtros.append(_condicion_logica(clave, valor))
+            elif clave not in _PARAMETROS_RESERVADOS and '.' not in clave:
+                filtros.append(_condicion(clave, valor))
+        filas = [f for f in self._candidatas(tabla, parametros) if all(filtro(f) for filtro in filtros)]
+        prefer = request.headers.get('prefer', '')
+        metodo = request.method
+
+        if metodo == 'POST':
+            return self._insertar(tabla, json.loads(request.content), prefer, parametros.get('on_conflict'))
+        if metodo == 'PATCH':
+            cambios = json.loads(request.content)
+            for fila in filas:
+                self.actualizar(tabla, fila, cambios)
+            return self._respuesta(filas, prefer)
+        if metodo == 'DELETE':
+            self._borrar(tabla, filas)
+            return self._respuesta(filas, prefer)
+
+        self.selects.append((tabla, parametros.get('select', '*').replace(' ', '')))
+        total = len(filas)
+        filas = self._ordenar(filas, parametros.get_list('order'))
+        inicio, fin = 0, None
+        rango = request.headers.get('range')
+        if rango:
+            desde, _, hasta = rango.partition('-')
+            inicio, fin = int(desde), int(hasta) + 1
+        if 'offset' in parametros:
+            inicio += int(parametros['offset'])
+        if 'limit' in parametros:
+            fin = min(fin, inicio + int(parametros['limit'])) if fin is not None else inicio + int(parametros['limit'])
+        filas = filas[inicio:fin]
+        filas = [self._proyectar(tabla, fila, parametros.get('select', '*')) for fila in filas]
+
+        encabezados = {}
+        if 'count=' in prefer:
+            encabezados['content-range'] = f"{inicio}-{inicio + len(filas) - 1}/{total}" if filas else f"*/{total}"
+        if 'vnd.pgrst.object' in request.headers.get('accept', ''):
+            if len(filas) != 1:
+                raise _ErrorPostgrest(406, 'PGRST116', 'JSON object requested, multiple (or no) rows returned')
+            return httpx.Response(200, json=filas[0], headers=encabezados)
+        if metodo == 'HEAD':
+            return httpx.Response(200, headers=encabezados)
+        return httpx.Response(200, content=json.dumps(filas, default=str).encode(), headers=encabezados)
+
+    def _candidatas(self, tabla, parametros):
+        # id=eq.X / id=in.(...) usan un índice por id, como la clave primaria (catálogos de 100k filas)
+        filtro = parametros.get('id', '')
+        if not filtro.startswith(('eq.', 'in.')):
+            return self.tablas[tabla]
+        indice = self._indice(tabla)
+        operador, _, valor = filtro.partition('.')
+        ids = [_sin_comillas(v) for v in _dividir(valor.strip('()'))] if operador == 'in' else [_sin_comillas(valor)]
+        return [indice[i] for i in dict.fromkeys(ids) if i in indice]
+
+    def _indice(self, tabla):
+        indice = self._indices.get(tabla)
+        if indice is None:
+            indice = self._indices[tabla] = {str(f.get('id')): f for f in self.tablas[tabla]}
+        return indice
+
+    def agregar(self, tabla, fila):
+        # Insert sin pasar por HTTP (para las RPC emuladas); asigna id si falta
+        if tabla not in self.tablas:
+            raise _ErrorPostgrest(404, '42P01', f'relation "public.{tabla}" does not exist')
+        fila = dict(fila)
+        if fila.get('id') is None:
+            fila['id'] = self._siguiente_id(tabla)
+        self.tablas[tabla].append(fila)
+        self._indices.pop(tabla, None)
+        self._disparar(tabla, None, fila)
+        return fila
+
+    def actualizar(self, tabla, fila, cambios):
+        # Update sin pasar por HTTP; los disparadores ven la fila anterior y la nueva
+        anterior = dict(fila)
+        fila.update(cambios)
+        self._disparar(tabla, anterior, fila)
+        return fila
+
+    def _borrar(self, tabla, filas):
+        ids = {id(f) for f in filas}
+        self.tablas[tabla] = [f for f in self.tablas[tabla] if id(f) not in ids]
+        self._indices.pop(tabla, None)
+        for fila in filas:
+            self._disparar(tabla, fila, None)
+        for hija, columna in CASCADAS.get(tabla, ()):
+            if hija in self.tablas and filas:
+                claves = {f.get('id') for f in filas}
+                self._borrar(hija, [f for f in self.tablas[hija] if f.get(columna) in claves])
+
+    def _disparar(self, tabla, anterior, nueva):
+        if tabla in self.disparadores:
+            self.disparadores[tabla](self, anterior, nueva)
+
+    def _insertar(self, tabla, cuerpo, prefer, on_conflict):
+        filas = cuerpo if isinstance(cuerpo, list) else [cuerpo]
+        unir = 'merge-duplicates' in prefer
+        claves = tuple(on_conflict.split(',')) if on_conflict else CLAVES.get(tabla, ('id',))
+        resultado = []
+        for nueva in filas:
+            nueva = dict(nueva)
+            existente = None
+            if unir and all(c in nueva for c in claves):
+                existente = next((f for f in self.tablas[tabla] if all(f.get(c) == nueva[c] for c in claves)), None)
+            if existente is not None:
+                resultado.append(self.actualizar(tabla, existente, nueva))
+                continue
+            if claves == ('id',) and nueva.get('id') is None:
+                nueva['id'] = self._siguiente_id(tabla)
+            self.tablas[tabla].append(nueva)
+            self._indices.pop(tabla, None)
+            self._disparar(tabla, None, nueva)
+            resultado.append(nueva)
+        return self._respuesta(resultado, prefer, estado=201)
+
+    def _respuesta(self, filas, prefer, estado=200):
+        if 'return=minimal' in prefer:
+            return httpx.Response(204 if estado == 200 else estado)
+        return httpx.Response(estado, content=json.dumps(filas, default=str).encode())
+
+    def _ordenar(self, filas, ordenes):
+        criterios = [c for orden in ordenes for c in orden.split(',') if c]
+        for criterio in reversed(criterios):
+            columna, *modificadores = criterio.split('.')
+            descendente = 'desc' in modificadores
+            nulos_primero = 'nullsfirst' in modificadores or (descendente and 'nullslast' not in modificadores)
+            con_valor = sorted((f for f in filas if f.get(columna) is not None),
+                               key=lambda f: f[columna], reverse=descendente)
+            nulos = [f for f in filas if f.get(columna) is None]
+            filas = nulos + con_valor if nulos_primero else con_valor + nulos
+        return filas
+
+    def _proyectar(self, tabla, fila, seleccion):
+        resultado = {}
+        for columna in _dividir(seleccion.replace(' ', '')):
+            if columna == '*':
+                resultado.update(fila)
+            elif '(' in columna:
+                nombre, _, interno = columna.partition('(')
+                resultado[nombre] = self._embebido(tabla, fila, nombre, interno[:-1])
+            else:
+                alias, _, origen = columna.rpartition(':')
+                resultado[alias or origen] = fila.get(origen)
+        return resultado
+
+    def _embebido(self, tabla, fila, relacionada, seleccion):
+        # Relación por convención de nombres: carrito.producto_id -> productos, ventas <- pagos.venta_id
+        if relacionada not in self.tablas:
+            raise _ErrorPostgrest(400, 'PGRST200', f"Could not find a relationship between '{tabla}' and '{relacionada}'")
+        foranea = f"{_singular(relacionada)}_id"
+        if foranea in fila:
+            destino = self._indice(relacionada).get(str(fila[foranea]))
+            return self._proyectar(relacionada, destino, seleccion) if destino else None
+        inversa = f"{_singular(tabla)}_id"
+        return [self._proyectar(relacionada, f, seleccion) for f in self.tablas[relacionada] if f.get(inversa) == fila.get('id')]
+
+
+# Emulación de las funciones de los .sql para usarlas con PostgrestMemoria(rpcs=RPCS_SQL).
+# Cada RPC corre con el lock del sustituto tomado: es atómica, como la transacción en Postgres
+
+def registrar_venta(memoria, parametros):
+    # db_registrar_venta.sql (sin el resumen diario, que es otra función)
+    datos = parametros['p_venta']
+    venta = memoria.agregar('ventas', {
+        'cliente_id': datos.get('cliente_id'), 'usuario_id': datos.get('usuario_id'),
+        'fecha': datos.get('fecha') or datetime.datetime.now().isoformat(), 'total': datos.get('total'),
+        'subtotal': datos.get('subtotal', datos.get('total')), 'descuento': datos.get('descuento') or 0,
+    })
+    productos = []
+    if parametros.get('p_actualizar_inventario'):
+        indice = memoria._indice('productos')
+        cantidades = {}
+        for item in parametros.get('p_items') or []:
+            producto = indice.get(str(item.get('producto_id')))
+            if 'producto_id' not in item or producto is None:
+                continue
+            detalle = {
+                'producto_id': producto['id'], 'nombre': producto.get('nombre') or item.get('nombre') or 'Producto sin nombre',
+                'precio': item['precio'] if item.get('precio') is not None else producto.get('precio') or 0,
+                'cantidad': item.get('cantidad') or 0, 'sku': producto.get('sku') or '', 'codigo_barras': producto.get('codigo_barras') or '',
+            }
+            memoria.agregar('detalles_venta', dict(detalle, venta_id=venta['id']))
+            productos.append({'id': producto['id'], 'nombre': detalle['nombre'], 'cantidad': detalle['cantidad'],
+                              'precio': detalle['precio'], 'sku': detalle['sku'], 'codigo_barras': detalle['codigo_barras']})
+            cantidades[producto['id']] = cantidades.get(producto['id'], 0) + detalle['cantidad']
+        for producto_id, cantidad in cantidades.items():
+            producto = indice[str(producto_id)]
+            anterior = producto.get('stock') or 0
+            memoria.actualizar('productos', producto, {'stock': max(0, anterior - cantidad)})
+            if 'historial_inventario' in memoria.tablas:
+                memoria.agregar('historial_inventario', {
+                    'producto_id': producto_id, 'stock_anterior': anterior, 'stock_nuevo': producto['stock'],
+                    'diferencia': producto['stock'] - anterior, 'fecha': datetime.datetime.now().isoformat(),
+                    'usuario': str(venta['usuario_id'] or 'sistema'), 'motivo': f"Venta #{venta['id']}",
+                })
+    for pago in parametros.get('p_pagos') or []:
+        memoria.agregar('pagos', {
+            'venta_id': venta['id'], 'metodo_pago': pago.get('metodo_pago'), 'monto': pago.get('monto'),
+            'fecha': pago.get('fecha') or venta['fecha'], 'referencia': pago.get('referencia') or '',
+            'estado': pago.get('estado') or 'completado', 'datos_adicionales': pago.get('datos_adicionales'),
+        })
+    return [{'venta': venta, 'productos': productos}]
+
+
+def agregar_carrito(memoria, parametros):
+    # db_carrito_agregar.sql: una línea por (vendedor_id, producto_id), la cantidad se suma
+    indice = memoria._indice('productos')
+    grupos = {}
+    for item in parametros['p_items']:
+        if str(item.get('producto_id')) in indice:
+            clave = (int(item.get('vendedor_id') or 0), int(item['producto_id']))
+            grupos[clave] = grupos.get(clave, 0) + int(item.get('cantidad') or 0)
+    resultado = []
+    for (vendedor_id, producto_id), cantidad in grupos.items():
+        linea = next((f for f in memoria.tablas['carrito']
+                      if int(f.get('vendedor_id') or 0) == vendedor_id and f.get('producto_id') == producto_id), None)
+        if linea is not None:
+            memoria.actualizar('carrito', linea, {'cantidad': linea['cantidad'] + cantidad})
+            resultado.append({'item': linea, 'nuevo': False})
+        else:
+            linea = memoria.agregar('carrito', {'vendedor_id': vendedor_id or None, 'producto_id': producto_id, 'cantidad': cantidad})
+            resultado.append({'item': linea, 'nuevo': True})
+    return resultado
+
+
+def ajustar_stock(memoria, parametros):
+    # db_ajustar_stock.sql: diferencias relativas sumadas por producto; no se aplican las que dejan stock negativo
+    indice = memoria._indice('productos')
+    diferencias = {}
+    for ajuste in parametros['p_ajustes']:
+        diferencias[int(ajuste['producto_id'])] = diferencias.get(int(ajuste['producto_id']), 0) + int(ajuste['diferencia'])
+    resultado = []
+    for producto_id, diferencia in diferencias.items():
+        producto = indice.get(str(producto_id))
+        if producto is not None and (producto.get('stock') or 0) + diferencia >= 0:
+            memoria.actualizar('productos', producto, {'stock': (producto.get('stock') or 0) + diferencia})
+            resultado.append({'producto_id': producto_id, 'stock_nuevo': producto['stock']})
+    return resultado
+
+
+def asignar_skus(memoria, parametros):
+    # db_sku_contadores.sql: los SKUs de varios productos en una sola sentencia
+    indice = memoria._indice('productos')
+    resultado = []
+    for asignacion in parametros['p_skus']:
+        producto = indice.get(str(asignacion['id']))
+        if producto is not None:
+            memoria.actualizar('productos', producto, {'sku': asignacion['sku']})
+            resultado.append({'producto_id': producto['id'], 'sku': producto['sku']})
+    return resultado
+
+
+RPCS_SQL = {'registrar_venta': registrar_venta, 'agregar_carrito': agregar_carrito, 'ajustar_stock': ajustar_stock,
+            'asignar_skus': asignar_skus}
+
+
+# Triggers de db_carrito_resumen.sql, para PostgrestMemoria(disparadores=DISPARADORES_SQL)
+
+def carrito_resumen(memoria, anterior, nueva):
+    # trg_carrito_importe guarda el importe en la línea; trg_carrito_resumen resta el guardado y suma el nuevo
+    if nueva is not None:
+        producto = memoria._indice('productos').get(str(nueva.get('producto_id'))) or {}
+        nueva['resumen_subtotal'] = (producto.get('precio') or 0) * (nueva.get('cantidad') or 0)
+        nueva['resumen_descuentos'] = nueva['resumen_subtotal'] * max(producto.get('descuento') or 0, 0) / 100
+    if 'carrito_resumen' not in memoria.tablas:
+        return
+    for linea, signo in ((anterior, -1), (nueva, 1)):
+        if linea is None:
+            continue
+        vendedor_id = linea.get('vendedor_id') or 0
+        resumen = next((f for f in memoria.tablas['carrito_resumen'] if f['vendedor_id'] == vendedor_id), None)
+        if resumen is None:
+            resumen = memoria.agregar('carrito_resumen', {'vendedor_id': vendedor_id, 'subtotal': 0, 'descuentos': 0, 'items': 0})
+        resumen['subtotal'] += signo * (linea.get('resumen_subtotal') or 0)
+        resumen['descuentos'] += signo * (linea.get('resumen_descuentos') or 0)
+        resumen['items'] += signo
+        resumen['total'] = resumen['subtotal'] - resumen['descuentos']
+
+
+def carrito_resumen_precio(memoria, anterior, nueva):
+    # trg_carrito_resumen_precio: otro precio o descuento vuelve a calcular las líneas con ese producto
+    if anterior is None or nueva is None:
+        return
+    if anterior.get('precio') == nueva.get('precio') and anterior.get('descuento') == nueva.get('descuento'):
+        return
+    for linea in [f for f in memoria.tablas.get('carrito', ()) if f.get('producto_id') == nueva.get('id')]:
+        memoria.actualizar('carrito', linea, {})
+
+
+DISPARADORES_SQL = {'carrito': carrito_resumen, 'productos': carrito_resumen_precio}
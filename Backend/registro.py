@@ -0,0 +1,140 @@
+#Propósito: Logging estructurado (JSON) escrito por un hilo en segundo plano, con niveles por módulo, truncado y muestreo.
+
+from flask import has_request_context, request
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import datetime
+import json
+import logging
+import os
+import queue
+import random
+import reprlib
+import sys
+
+LOG_NIVEL = os.environ.get('LOG_NIVEL', 'INFO').upper()
+# "ventas=DEBUG,usuarios=WARNING": nivel por módulo (nombre del logger)
+LOG_NIVELES = os.environ.get('LOG_NIVELES', '')
+# "ventas=0.1": fracción de registros DEBUG/INFO que se conservan por módulo (WARNING o más siempre se escriben)
+LOG_MUESTREO = os.environ.get('LOG_MUESTREO', '')
+LOG_MAX_CARACTERES = int(os.environ.get('LOG_MAX_CARACTERES', 1000))
+LOG_FORMATO = os.environ.get('LOG_FORMATO', 'json')
+
+# Atributos propios de LogRecord; el resto son campos agregados con extra={...}
+_ATRIBUTOS_BASE = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_repr = reprlib.Repr()
+_repr.maxstring = LOG_MAX_CARACTERES
+_repr.maxother = LOG_MAX_CARACTERES
+_repr.maxdict = _repr.maxlist = 20
+_repr.maxlevel = 3
+
+_listener = None
+
+
+def _parsear_pares(texto):
+    pares = {}
+    for par in texto.split(','):
+        if '=' in par:
+            clave, valor = par.split('=', 1)
+            pares[clave.strip()] = valor.strip()
+    return pares
+
+
+def _acotar(valor):
+    # Representación de tamaño acotado: un payload de 200 ítems no se serializa entero
+    if isinstance(valor, (int, float, bool)) or valor is None:
+        return valor
+    if isinstance(valor, str):
+        return valor if len(valor) <= LOG_MAX_CARACTERES else valor[:LOG_MAX_CARACTERES] + '...'
+    if isinstance(valor, BaseException):
+        return _acotar(str(valor))
+    return _repr.repr(valor)
+
+
+class _Muestreo(logging.Filter):
+    def __init__(self, tasas):
+        super().__init__()
+        self.tasas = tasas
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        tasa = self.tasas.get(record.name)
+        return tasa is None or random.random() < tasa
+
+
+class _ManejadorCola(QueueHandler):
+    # Se ejecuta en el hilo de la solicitud: arma el mensaje con argumentos acotados
+    # (pueden cambiar después) y encola; la serialización y la escritura quedan para el hilo del listener
+
+    def prepare(self, record):
+        mensaje = str(record.msg)
+        if record.args:
+            try:
+                if isinstance(record.args, tuple):
+                    mensaje = mensaje % tuple(_acotar(a) for a in record.args)
+                elif '%(' in mensaje:
+                    mensaje = mensaje % {clave: _acotar(valor) for clave, valor in record.args.items()}
+                else:
+                    # logging convierte un único argumento dict en record.args
+                    mensaje = mensaje % (_acotar(record.args),)
+            except (TypeError, ValueError):
+                mensaje = f"{mensaje} {_acotar(record.args)}"
+        copia = logging.makeLogRecord(record.__dict__)
+        copia.msg = _acotar(mensaje)
+        copia.args = None
+        if record.exc_info:
+            copia.exc_text = logging.Formatter().formatException(record.exc_info)[-LOG_MAX_CARACTERES * 4:]
+        copia.exc_info = None
+        if has_request_context():
+            copia.ruta = f"{request.method} {request.path}"
+        for clave in set(vars(copia)) - _ATRIBUTOS_BASE:
+            setattr(copia, clave, _acotar(getattr(copia, clave)))
+        return copia
+
+
+class FormatoJSON(logging.Formatter):
+    def format(self, record):
+        datos = {
+            'fecha': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            'nivel': record.levelname,
+            'modulo': record.name,
+            'mensaje': record.getMessage(),
+            'pid': record.process,
+        }
+        for clave in set(vars(record)) - _ATRIBUTOS_BASE:
+            datos[clave] = getattr(record, clave)
+        if record.exc_text:
+            datos['excepcion'] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+def configurar():
+    # Un listener por proceso; los loggers de los módulos (logging.getLogger(__name__)) propagan a la raíz
+    global _listener
+    if _listener is not None:
+        return
+    cola = queue.SimpleQueue()
+    salida = logging.StreamHandler(sys.stdout)
+    if LOG_FORMATO == 'json':
+        salida.setFormatter(FormatoJSON())
+    else:
+        salida.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    manejador = _ManejadorCola(cola)
+    tasas = {modulo: float(tasa) for modulo, tasa in _parsear_pares(LOG_MUESTREO).items()}
+    if tasas:
+        manejador.addFilter(_Muestreo(tasas))
+
+    raiz = logging.getLogger()
+    for anterior in list(raiz.handlers):
+        raiz.removeHandler(anterior)
+    raiz.addHandler(manejador)
+    raiz.setLevel(LOG_NIVEL)
+    for modulo, nivel in _parsear_pares(LOG_NIVELES).items():
+        logging.getLogger(modulo).setLevel(nivel.upper())
+
+    _listener = QueueListener(cola, salida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,81 @@
+#Propósito: Resumen diario de ventas (ventas_resumen_diario) mantenido al registrar ventas y pagos.
+
+from db import supabase, CODIGOS_RPC_NO_DISPONIBLE, CODIGOS_TABLA_NO_DISPONIBLE
+from postgrest.exceptions import APIError
+import logging
+
+log = logging.getLogger(__name__)
+
+# Se desactiva al detectar que db_resumen_diario.sql no está instalado
+_resumen_disponible = True
+
+
+def _no_instalado(error):
+    global _resumen_disponible
+    if error.code in CODIGOS_RPC_NO_DISPONIBLE or error.code in CODIGOS_TABLA_NO_DISPONIBLE:
+        log.warning("Resumen diario no disponible, se calculará desde ventas y pagos: %s", error.message)
+        _resumen_disponible = False
+        return True
+    return False
+
+
+def disponible():
+    return _resumen_disponible
+
+
+def montos_por_metodo(pagos):
+    # {'efectivo': 100.0, 'tarjeta': 50.0} a partir de registros de pago
+    metodos = {}
+    for pago in pagos:
+        if pago.get('metodo_pago'):
+            metodos[pago['metodo_pago']] = metodos.get(pago['metodo_pago'], 0) + float(pago.get('monto') or 0)
+    return metodos
+
+
+def acumular(fecha, ventas=0, monto=0, metodos=None):
+    # Sumar al resumen del día; un fallo aquí no debe interrumpir la venta o el pago
+    if not _resumen_disponible or not fecha:
+        return
+    try:
+        supabase.rpc('acumular_resumen_diario', {
+            'p_fecha': str(fecha)[:10],
+            'p_ventas': ventas,
+            'p_monto': float(monto or 0),
+            'p_metodos': metodos or {}
+        }).execute()
+    except APIError as e:
+        if not _no_instalado(e):
+            log.error("Error al actualizar resumen diario: %s", e)
+    except Exception as e:
+        log.error("Error al actualizar resumen diario: %s", e)
+
+
+def acumular_pagos(pagos):
+    # Agrupar los pagos por día antes de acumular (un pago dividido puede cruzar días)
+    por_dia = {}
+    for pago in pagos:
+        por_dia.setdefault(str(pago.get('fecha', ''))[:10], []).append(pago)
+    for fecha, pagos_dia in por_dia.items():
+        acumular(fecha, metodos=montos_por_metodo(pagos_dia))
+
+
+def obtener(fecha_desde, fecha_hasta):
+    # Filas del resumen en el rango (fechas YYYY-MM-DD); None si la tabla no está instalada
+    if not _resumen_disponible:
+        return None
+    try:
+        resultado = supabase.table('ventas_resumen_diario').select('*').gte('fecha', fecha_desde).lte('fecha', fecha_hasta).order('fecha').execute()
+        return resultado.data
+    except APIError as e:
+        if _no_instalado(e):
+            return None
+        raise
+
+
+def reconstruir(fecha_desde=None, fecha_hasta=None):
+    # Recalcular el resumen a partir del historial en una sola llamada
+    resultado = supabase.rpc('reconstruir_resumen_diario', {
+        'p_desde': fecha_desde,
+        'p_hasta': fecha_hasta
+    }).execute()
+    return resultado.data
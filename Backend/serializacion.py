@@ -0,0 +1,66 @@
+#Propósito: Proveedor JSON de la app (orjson si está instalado) para jsonify y request.get_json().
+
+from flask.json.provider import DefaultJSONProvider
+import datetime
+import decimal
+import os
+
+try:
+    import orjson
+except ImportError:
+    # Sin orjson se usa el módulo json estándar con las mismas conversiones
+    orjson = None
+
+# orjson (por defecto si está instalado) o estandar
+JSON_PROVEEDOR = os.environ.get('JSON_PROVEEDOR', 'orjson' if orjson is not None else 'estandar')
+
+
+def convertir(valor):
+    # numeric de Postgres llega como Decimal: se envía como texto con sus dígitos exactos
+    # ("1234567.89"), float() lo redondearía en binario; fechas en ISO 8601 como las de Supabase
+    if isinstance(valor, decimal.Decimal):
+        return str(valor)
+    if isinstance(valor, (datetime.datetime, datetime.date, datetime.time)):
+        return valor.isoformat()
+    return DefaultJSONProvider.default(valor)
+
+
+class ProveedorEstandar(DefaultJSONProvider):
+    # Módulo json estándar con las conversiones de convertir() (en vez de str(Decimal) y fechas HTTP)
+    default = staticmethod(convertir)
+
+
+class ProveedorOrjson(DefaultJSONProvider):
+    # orjson serializa en C y entrega bytes: la respuesta se arma sin pasar por str
+
+    default = staticmethod(convertir)
+
+    def _opciones(self, sort_keys=None):
+        opciones = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            opciones |= orjson.OPT_SORT_KEYS
+        if self._app.debug:
+            opciones |= orjson.OPT_INDENT_2
+        return opciones
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._opciones(kwargs.get('sort_keys'))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=self._opciones() | orjson.OPT_APPEND_NEWLINE),
+                                        mimetype=self.mimetype)
+
+
+PROVEEDORES = {'estandar': ProveedorEstandar}
+if orjson is not None:
+    PROVEEDORES['orjson'] = ProveedorOrjson
+
+
+def configurar(app, nombre=JSON_PROVEEDOR):
+    # jsonify, make_response(dict) y request.get_json() pasan por app.json
+    app.json = PROVEEDORES[nombre](app)
+    return app.json
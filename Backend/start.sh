@@ -6,4 +6,4 @@ pip install -r requirements.txt
 
 # Iniciar la aplicación con Gunicorn
 # Especificando el puerto explícitamente
-exec gunicorn --bind 0.0.0.0:$PORT app:app
\ No newline at end of file
+exec gunicorn -c gunicorn.conf.py --bind 0.0.0.0:$PORT app:app
\ No newline at end of file
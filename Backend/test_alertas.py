@@ -0,0 +1,78 @@
+import time
+import alertas
+from alertas import DifusorAlertas
+
+
+class _ClienteFalso:
+    def __init__(self):
+        self.filas = []
+        self.consultas = 0
+
+    def table(self, nombre):
+        cliente = self
+
+        class Consulta:
+            def __init__(self):
+                self.desde = None
+                self.desc = False
+                self.limite = None
+
+            def select(self, columnas):
+                return self
+
+            def gt(self, columna, valor):
+                self.desde = valor
+                return self
+
+            def order(self, columna, desc=False):
+                self.desc = desc
+                return self
+
+            def limit(self, limite):
+                self.limite = limite
+                return self
+
+            def execute(self):
+                cliente.consultas += 1
+                filas = [f for f in cliente.filas if self.desde is None or f['id'] > self.desde]
+                filas = sorted(filas, key=lambda f: f['id'], reverse=self.desc)[:self.limite]
+
+                class Resultado:
+                    data = filas
+                return Resultado()
+        return Consulta()
+
+
+def _alerta(id, estado='bajo'):
+    return {"id": id, "producto_id": id, "nombre": f"P{id}", "estado_anterior": "normal", "estado": estado, "stock": 3, "umbral": 10}
+
+
+def test_flujo_recupera_y_reparte(monkeypatch):
+    """Con Last-Event-ID se envían primero las alertas perdidas y después las nuevas, sin duplicados"""
+    cliente = _ClienteFalso()
+    cliente.filas = [_alerta(1), _alerta(2, 'agotado')]
+    monkeypatch.setattr(alertas, 'supabase', cliente)
+    difusor = DifusorAlertas(intervalo=0.02)
+
+    flujo = difusor.flujo(ultimo_evento=1, latido=1)
+    assert next(flujo).startswith('retry:')
+    assert next(flujo) == alertas.evento_sse(_alerta(2, 'agotado'))
+
+    # El hilo parte de la última alerta existente al haber un suscriptor
+    while difusor._ultimo_id is None:
+        time.sleep(0.01)
+    cliente.filas.append(_alerta(3))
+    evento = next(flujo)
+    assert evento.startswith('id: 3\nevent: bajo\ndata: ')
+    flujo.close()
+    assert difusor._suscriptores == set()
+
+
+def test_latido_sin_alertas(monkeypatch):
+    """Sin transiciones el stream envía comentarios de latido para mantener la conexión"""
+    monkeypatch.setattr(alertas, 'supabase', _ClienteFalso())
+    difusor = DifusorAlertas(intervalo=0.02)
+    flujo = difusor.flujo(latido=0.05)
+    next(flujo)
+    assert next(flujo) == ": latido\n\n"
+    flujo.close()
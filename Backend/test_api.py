@@ -16,9 +16,131 @@ def test_health_check(client):
     data = json.loads(response.data)
     assert data['status'] == 'ok'
 
-def test_productos_endpoint(client):
-    """Verifica que el endpoint de productos responda correctamente"""
+def test_productos_endpoint(api):
+    """Sin AUTH_REQUERIDA el frontend actual (sin token) sigue leyendo productos"""
+    client, _, _ = api({'productos': [{"id": 1, "nombre": "Anillo", "precio": 100.0, "stock": 5}]})
     response = client.get('/api/productos')
-    assert response.status_code in [200, 401]  # 200 si no requiere auth, 401 si requiere
+    assert response.status_code == 200
+    assert response.get_json()[0]['nombre'] == 'Anillo'
+
+# Añade más pruebas para otros endpoints según sea necesario
+
+def test_cliente_supabase_compartido():
+    """Verifica que todos los blueprints comparten el mismo cliente de Supabase"""
+    import db
+    import productos, carrito, ventas, pagos, inventario, usuarios
+    for modulo in (productos, carrito, ventas, pagos, inventario, usuarios):
+        assert modulo.supabase is db.supabase
+    assert db.obtener_cliente() is db.obtener_cliente()
+
+def test_en_paralelo_conserva_orden():
+    """Las consultas independientes se ejecutan a la vez y los resultados respetan el orden"""
+    import db
+    import time
+    def consulta(valor):
+        def ejecutar():
+            time.sleep(0.1)
+            return valor
+        return ejecutar
+    inicio = time.monotonic()
+    assert db.en_paralelo(consulta(1), consulta(2), consulta(3)) == [1, 2, 3]
+    assert time.monotonic() - inicio < 0.25
+
+def test_reporte_diario_incluye_ventas(api):
+    """El reporte diario conserva la lista de ventas salvo con incluir_ventas=false"""
+    client, encabezados, _ = api({'ventas': [{"id": 1, "fecha": "2026-10-17T12:00:00", "total": 300.0}],
+                                 'pagos': [{"id": 1, "venta_id": 1, "metodo_pago": "efectivo", "monto": 300.0,
+                                            "fecha": "2026-10-17T12:00:00"}]})
+    reporte = client.get('/api/ventas/reportes/diario?fecha=2026-10-17', headers=encabezados).get_json()
+    assert reporte['total_ventas'] == 1 and [v['id'] for v in reporte['ventas']] == [1]
+    solo_totales = client.get('/api/ventas/reportes/diario?fecha=2026-10-17&incluir_ventas=false', headers=encabezados).get_json()
+    assert 'ventas' not in solo_totales and solo_totales['monto_total'] == 300.0
+
+def test_skus_distintos_sin_rpc(api, monkeypatch):
+    """Sin reservar_skus, dos reservas antes de insertar no repiten número y el respaldo no repite SKU"""
+    import productos
+    api({'productos': [{"id": 1, "nombre": "Anillo", "color": "Rojo", "sku": "ANRO1"}]})
+    monkeypatch.setattr(productos, '_ultimo_sku_por_prefijo', {})
+    assert productos.reservar_skus('Anillo', 'Rojo') == ['ANRO2']
+    assert productos.reservar_skus('Anillo', 'Rojo', 2) == ['ANRO3', 'ANRO4']
+
+    def falla(*args):
+        raise RuntimeError("sin conexión")
+    monkeypatch.setattr(productos, 'reservar_skus', falla)
+    assert len({productos.generar_sku('Anillo', 'Rojo') for _ in range(5)}) == 5
+
+def test_lote_resuelve_codigos_en_una_consulta(api):
+    """Una ráfaga de códigos (SKU, barras, QR, id) se resuelve con una sola consulta a productos"""
+    client, encabezados, memoria = api({
+        'productos': [{"id": i, "nombre": f"Anillo {i}", "precio": 100.0, "stock": 10, "sku": f"ANRO{i}",
+                       "codigo_barras": f"75{i:010d}"} for i in range(1, 6)],
+        'carrito': [],
+    })
+    # '²' y '٣' son isdigit() pero no ids: se buscan como texto sin romper la ráfaga
+    codigos = ["ANRO1", "750000000002", "ANRO3|3", "4", "NOEXISTE", "²", "ANRO5|٣"]
+    respuesta = client.post('/api/carrito/lote', json={"vendedor_id": 7, "items": [{"codigo": c} for c in codigos]},
+                            headers=encabezados).get_json()
+    assert sorted(linea['producto_id'] for linea in respuesta['items']) == [1, 2, 3, 4, 5]
+    assert [r['item']['codigo'] for r in respuesta['rechazados']] == ["NOEXISTE", "²"]
+    assert memoria.selects[0][0] == 'productos' and [t for t, _ in memoria.selects].count('productos') == 1
+    assert client.get('/api/productos/codigo/٣', headers=encabezados).status_code == 404
+
+def test_ajuste_acepta_id_como_texto(api):
+    """Un producto_id enviado como texto se ajusta igual; uno no numérico se rechaza sin consultar"""
+    client, encabezados, memoria = api({'productos': [{"id": 5, "nombre": "Anillo", "stock": 10}], 'historial_inventario': []})
+    respuesta = client.post('/api/inventario/ajuste', json=[{"producto_id": "5", "cantidad": -2},
+                                                            {"producto_id": "abc", "cantidad": 1}], headers=encabezados)
+    resultados = respuesta.get_json()['resultados']
+    assert respuesta.status_code == 200
+    assert resultados[0]['exito'] and resultados[0]['producto_id'] == 5 and resultados[0]['stock_nuevo'] == 8
+    assert resultados[1] == {"producto_id": "abc", "exito": False, "error": "El producto_id debe ser un número entero"}
+    assert memoria.tablas['productos'][0]['stock'] == 8
+
+def test_ventas_sin_rpc_no_pierden_stock(api):
+    """Sin registrar_venta el stock baja con ajustar_stock: ventas simultáneas no se pisan y sin la RPC la venta falla"""
+    from concurrent.futures import ThreadPoolExecutor
+    from historial import escritor_historial
+    from postgrest_memoria import ajustar_stock
+    client, encabezados, memoria = api({
+        'productos': [{"id": 1, "nombre": "Anillo", "precio": 100.0, "stock": 10}],
+        'ventas': [], 'detalles_venta': [], 'pagos': [], 'historial_inventario': [],
+    }, latencia=0.005, rpcs={'ajustar_stock': ajustar_stock})
+    venta = {"items": [{"producto_id": 1, "cantidad": 1, "precio": 100.0}], "actualizar_inventario": True}
+    with ThreadPoolExecutor(6) as ejecutor:
+        estados = list(ejecutor.map(lambda _: client.post('/api/ventas', json=venta, headers=encabezados).status_code, range(6)))
+    assert estados == [201] * 6
+    assert memoria.tablas['productos'][0]['stock'] == 4
+    assert ('PATCH', 'productos') not in memoria.llamadas
+    escritor_historial.vaciar()
+    assert sorted(f['stock_anterior'] for f in memoria.tablas['historial_inventario']) == [5, 6, 7, 8, 9, 10]
+
+    memoria.rpcs.clear()
+    respuesta = client.post('/api/ventas', json=venta, headers=encabezados)
+    assert respuesta.status_code == 500 and 'ajustar_stock' in respuesta.get_json()['error']
+    assert len(memoria.tablas['ventas']) == 6 and memoria.tablas['productos'][0]['stock'] == 4
+
+def test_ventas_por_cursor(api):
+    """El cursor recorre las ventas sin conteo que se achique y rechaza valores que alterarían el filtro"""
+    import base64
+    client, encabezados, _ = api({'ventas': [{"id": i, "fecha": f"2026-10-{i:02d}T12:00:00", "total": 10.0} for i in range(1, 6)]})
+    primera = client.get('/api/ventas?limit=2&fields=id', headers=encabezados).get_json()
+    assert [v['id'] for v in primera['ventas']] == [5, 4] and primera['total'] == 5 and primera['pages'] == 3
+    segunda = client.get(f"/api/ventas?limit=2&fields=id&cursor={primera['siguiente_cursor']}", headers=encabezados).get_json()
+    assert [v['id'] for v in segunda['ventas']] == [3, 2]
+    assert 'total' not in segunda and 'pages' not in segunda and 'page' not in segunda
+
+    for contenido in ['["2026-10-03\\\\\\")", 3]', '["2026-10-03T12:00:00,id.gt.0", 3]', '["2026-10-03T12:00:00", "3)"]']:
+        cursor = base64.urlsafe_b64encode(contenido.encode()).decode()
+        assert client.get(f'/api/ventas?cursor={cursor}', headers=encabezados).status_code == 400
 
-# Añade más pruebas para otros endpoints según sea necesario
\ No newline at end of file
+def test_etiquetas_asignan_skus_en_una_llamada(api, monkeypatch):
+    """Los SKUs faltantes se reservan por prefijo y se guardan todos con una sola RPC"""
+    import productos as modulo_productos
+    from postgrest_memoria import asignar_skus
+    monkeypatch.setattr(modulo_productos, '_ultimo_sku_por_prefijo', {})
+    productos = [{"id": i, "nombre": "Collar", "color": "Negro" if i % 2 else "Rojo", "precio": 10.0, "sku": None} for i in range(1, 5)]
+    client, encabezados, memoria = api({'productos': productos}, rpcs={'asignar_skus': asignar_skus})
+    etiquetas = client.get('/api/productos/etiquetas', headers=encabezados).get_json()
+    assert sorted(e['sku'] for e in etiquetas) == ['CONE1', 'CONE2', 'CORO1', 'CORO2']
+    assert [p['sku'] for p in memoria.tablas['productos']] == [e['sku'] for e in sorted(etiquetas, key=lambda e: e['producto_id'])]
+    assert memoria.llamadas.count(('POST', 'rpc/asignar_skus')) == 1 and ('PATCH', 'productos') not in memoria.llamadas
@@ -0,0 +1,101 @@
+import pytest
+import auth
+import usuarios
+from app import app
+from auth import RegistroUltimoLogin
+from contrasenas import hashear_local
+
+
+class _ClienteFalso:
+    def __init__(self, filas):
+        self.filas = filas
+        self.llamadas = []
+
+    def table(self, nombre):
+        cliente = self
+
+        class Consulta:
+            def __init__(self):
+                self.filtros = []
+                self.cambios = None
+
+            def select(self, columnas):
+                return self
+
+            def update(self, cambios):
+                self.cambios = cambios
+                return self
+
+            def eq(self, columna, valor):
+                self.filtros.append((columna, valor))
+                return self
+
+            def execute(self):
+                cliente.llamadas.append((nombre, 'update' if self.cambios else 'select'))
+                filas = [f for f in cliente.filas if all(f.get(c) == v for c, v in self.filtros)]
+                for fila in filas:
+                    fila.update(self.cambios or {})
+
+                class Resultado:
+                    data = filas
+                return Resultado()
+        return Consulta()
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    supabase = _ClienteFalso([{"id": 7, "nombre": "Ana", "correo": "ana@karma.com", "role": "admin",
+                               "contraseña": hashear_local("secreta")}])
+    monkeypatch.setattr(usuarios, 'supabase', supabase)
+    monkeypatch.setattr(auth, 'supabase', supabase)
+    monkeypatch.setattr(auth, 'registro_ultimo_login', RegistroUltimoLogin(intervalo=3600))
+    monkeypatch.setattr(usuarios, 'registro_ultimo_login', auth.registro_ultimo_login)
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client, supabase
+
+
+def test_login_y_perfil_sin_consultas(cliente):
+    """El perfil se responde desde el token firmado, sin consultar Supabase"""
+    client, supabase = cliente
+    respuesta = client.post('/api/auth/login', json={"correo": "ana@karma.com", "password": "secreta"})
+    assert respuesta.status_code == 200
+    token = respuesta.get_json()['usuario']['token']
+    assert supabase.llamadas == [('usuarios', 'select')]
+
+    perfil = client.get('/api/auth/profile', headers={'Authorization': f'Bearer {token}'})
+    assert perfil.status_code == 200
+    assert perfil.get_json()['id'] == 7 and perfil.get_json()['role'] == 'admin'
+    assert supabase.llamadas == [('usuarios', 'select')]
+
+
+def test_api_requiere_token(cliente, monkeypatch):
+    """Con AUTH_REQUERIDA, sin token o con un token alterado las rutas de /api responden 401"""
+    monkeypatch.setattr(auth, 'AUTH_REQUERIDA', True)
+    client, _ = cliente
+    assert client.get('/api/usuarios').status_code == 401
+    assert client.get('/api/usuarios', headers={'Authorization': 'Bearer x.y.z'}).status_code == 401
+
+
+def test_last_login_agrupado(cliente):
+    """Varios logins del mismo usuario se escriben como un único update"""
+    client, supabase = cliente
+    for _ in range(3):
+        client.post('/api/auth/login', json={"correo": "ana@karma.com", "password": "secreta"})
+    assert ('usuarios', 'update') not in supabase.llamadas
+    assert auth.registro_ultimo_login.escribir() == 1
+    assert supabase.llamadas.count(('usuarios', 'update')) == 1
+
+
+def test_registro_publico_no_asigna_roles(api, monkeypatch):
+    """Sin token de administrador el registro crea cuentas 'user' y un token inválido no pasa como anónimo"""
+    client, encabezados, memoria = api({'usuarios': []})
+    cuenta = {"nombre": "Eva", "correo": "eva@karma.com", "password": "secreta"}
+    assert client.post('/api/auth/register', json=dict(cuenta, role="admin")).status_code == 403
+    assert client.post('/api/auth/register', json=cuenta).get_json()['role'] == 'user'
+    assert client.put('/api/usuarios/1', json={"role": "admin"}).status_code == 403
+    assert memoria.tablas['usuarios'][0]['role'] == 'user'
+
+    assert client.get('/api/productos', headers={'Authorization': 'Bearer x.y.z'}).status_code == 401
+    admin = client.post('/api/usuarios', json=dict(cuenta, correo="jefe@karma.com", role="admin"), headers=encabezados)
+    assert admin.status_code == 201 and admin.get_json()['role'] == 'admin'
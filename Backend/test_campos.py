@@ -0,0 +1,78 @@
+import pytest
+import carrito
+from contrasenas import hashear_local
+
+
+@pytest.fixture
+def client(api, monkeypatch):
+    monkeypatch.setattr(carrito, '_resumen_disponible', False)
+    return api({
+        'productos': [{"id": i, "nombre": f"Anillo {i}", "precio": 100.0, "stock": 10, "sku": f"ANRO{i}",
+                       "codigo_barras": f"75{i:010d}", "categoria": "anillos", "color": "rojo", "descuento": 10} for i in range(1, 4)],
+        'carrito': [{"id": 1, "producto_id": 1, "cantidad": 2, "vendedor_id": 1},
+                    {"id": 2, "producto_id": 2, "cantidad": 1, "vendedor_id": 1}],
+        'ventas': [{"id": 1, "fecha": "2026-10-17T12:00:00", "total": 300.0, "descuento": 0, "usuario_id": 1}],
+        'pagos': [{"id": 1, "venta_id": 1, "metodo_pago": "efectivo", "monto": 100.0, "referencia": "R1",
+                   "datos_adicionales": {"nota": "x" * 200}}],
+        'usuarios': [{"id": 1, "nombre": "Ana", "correo": "ana@karma.com", "role": "admin", "last_login": None,
+                      "contraseña": hashear_local("secreta")}],
+    })
+
+
+def test_carrito_proyecta_el_join(client):
+    """fields se traduce al select con el embed de productos y el resumen sigue calculándose"""
+    client, encabezados, memoria = client
+    respuesta = client.get('/api/carrito?vendedor_id=1&fields=id,productos.nombre', headers=encabezados).get_json()
+    assert respuesta['items'] == [{"id": 1, "productos": {"nombre": "Anillo 1"}}, {"id": 2, "productos": {"nombre": "Anillo 2"}}]
+    assert respuesta['resumen']['subtotal'] == 300.0 and respuesta['resumen']['descuentos'] == 30.0
+    assert ('carrito', 'id,cantidad,productos(nombre,precio,descuento)') in memoria.selects
+
+    por_usuario = client.get('/api/carrito/usuario/1?fields=cantidad,productos', headers=encabezados).get_json()
+    assert por_usuario[0] == {"cantidad": 2, "productos": memoria.tablas['productos'][0]}
+    assert memoria.selects[-1] == ('carrito', 'cantidad,productos(*)')
+
+
+def test_ventas_y_pagos(client):
+    """Sin campos calculados no se consultan pagos; con ellos solo las columnas necesarias"""
+    client, encabezados, memoria = client
+    ventas = client.get('/api/ventas?fields=id,total', headers=encabezados).get_json()['ventas']
+    assert ventas == [{"id": 1, "total": 300.0}]
+    assert [t for t, _ in memoria.selects] == ['ventas']
+
+    ventas = client.get('/api/ventas?fields=id,saldo_pendiente', headers=encabezados).get_json()['ventas']
+    assert ventas == [{"id": 1, "saldo_pendiente": 200.0}]
+    assert memoria.selects[-1] == ('pagos', 'venta_id,metodo_pago,monto')
+
+    detalle = client.get('/api/ventas/1?fields=total,estado', headers=encabezados).get_json()
+    assert detalle == {"total": 300.0, "estado": "parcial"}
+
+    pago = client.get('/api/pagos/1?fields=monto,referencia', headers=encabezados).get_json()
+    assert pago == {"monto": 100.0, "referencia": "R1"}
+    por_venta = client.get('/api/pagos/venta/1?fields=id', headers=encabezados).get_json()
+    assert por_venta['pagos'] == [{"id": 1}] and por_venta['total_pagado'] == 100.0
+
+
+def test_productos_desde_cache_con_su_etag(client):
+    """El catálogo en cache se recorta y cada proyección tiene su ETag"""
+    client, encabezados, _ = client
+    completo = client.get('/api/productos', headers=encabezados)
+    parcial = client.get('/api/productos?fields=id,sku', headers=encabezados)
+    assert parcial.get_json() == [{"id": i, "sku": f"ANRO{i}"} for i in range(1, 4)]
+    assert parcial.headers['ETag'] != completo.headers['ETag']
+    revalidado = client.get('/api/productos?fields=sku,id', headers=dict(encabezados, **{'If-None-Match': parcial.headers['ETag']}))
+    assert revalidado.status_code == 304
+    assert client.get('/api/productos/2?fields=nombre', headers=encabezados).get_json() == {"nombre": "Anillo 2"}
+
+
+def test_campos_invalidos_y_login(client):
+    """Campos fuera de la lista blanca responden 400; el login no lee columnas de más"""
+    client, encabezados, memoria = client
+    respuesta = client.get('/api/usuarios?fields=id,contraseña', headers=encabezados)
+    assert respuesta.status_code == 400 and 'contraseña' in respuesta.get_json()['error']
+    assert 'contraseña' not in respuesta.get_json()['permitidos']
+    assert client.get('/api/carrito?fields=productos.precio,productos.secreto', headers=encabezados).status_code == 400
+    assert client.get('/api/ventas?fields=', headers=encabezados).status_code == 400
+
+    login = client.post('/api/auth/login', json={"correo": "ana@karma.com", "password": "secreta"})
+    assert login.status_code == 200 and 'contraseña' not in login.get_json()['usuario']
+    assert ('usuarios', '*') not in memoria.selects
@@ -0,0 +1,53 @@
+from carga import Resultados, verificar
+
+
+def test_verificar_stock_y_carritos():
+    """Detecta sobreventa, stock que no bajó lo vendido y líneas duplicadas del mismo producto"""
+    resultados = Resultados()
+    resultados.flujo(0.1, {1: 6, 2: 3, 3: 2})
+    resultados.carrito([(7, 3, 2)], 0)
+    problemas = verificar({1: 5, 2: 10, 3: 10}, {1: 0, 2: 8, 3: 8}, resultados)
+    assert problemas[0].startswith("Sobreventa: producto 1 vendió 6")
+    assert problemas[1].startswith("Stock inconsistente: producto 2")
+    assert problemas[2] == "Carrito duplicado: vendedor 7 tiene 2 líneas del producto 3"
+    assert len(problemas) == 3
+
+
+def test_rpc_emuladas(api):
+    """registrar_venta y agregar_carrito del sustituto se comportan como los .sql"""
+    from postgrest_memoria import RPCS_SQL
+    client, encabezados, memoria = api({
+        'productos': [{"id": 1, "nombre": "Anillo", "precio": 100.0, "stock": 3}],
+        'ventas': [], 'detalles_venta': [], 'pagos': [], 'carrito': [], 'historial_inventario': [],
+    }, rpcs=RPCS_SQL)
+    for _ in range(2):
+        client.post('/api/carrito', json={"producto_id": 1, "cantidad": 1, "vendedor_id": 7}, headers=encabezados)
+    assert [(f['vendedor_id'], f['cantidad']) for f in memoria.tablas['carrito']] == [(7, 2)]
+
+    respuesta = client.post('/api/ventas', json={"items": [{"producto_id": 1, "cantidad": 5, "precio": 100.0}],
+                                                 "actualizar_inventario": True}, headers=encabezados)
+    assert respuesta.status_code < 400
+    assert memoria.tablas['productos'][0]['stock'] == 0 and len(memoria.tablas['detalles_venta']) == 1
+    assert ('POST', 'rpc/registrar_venta') in memoria.llamadas and ('PATCH', 'productos') not in memoria.llamadas
+
+
+def test_resumen_de_carrito_al_borrar_producto(api):
+    """Borrar un producto resta de carrito_resumen el importe guardado en sus líneas (borrado en cascada)"""
+    from postgrest_memoria import DISPARADORES_SQL
+    client, encabezados, memoria = api({
+        'productos': [{"id": 1, "nombre": "Anillo", "precio": 100.0, "descuento": 10, "stock": 5},
+                      {"id": 2, "nombre": "Collar", "precio": 50.0, "descuento": 0, "stock": 5}],
+        'carrito': [], 'carrito_resumen': [],
+    }, disparadores=DISPARADORES_SQL)
+    for producto_id, cantidad in ((1, 2), (2, 1)):
+        client.post('/api/carrito', json={"producto_id": producto_id, "cantidad": cantidad, "vendedor_id": 7}, headers=encabezados)
+    total = client.get('/api/carrito/total?vendedor_id=7', headers=encabezados).get_json()
+    assert total == {"subtotal": 250.0, "descuentos": 20.0, "total": 230.0, "items": 2}
+
+    assert client.delete('/api/productos/1', headers=encabezados).status_code == 200
+    assert [f['producto_id'] for f in memoria.tablas['carrito']] == [2]
+    total = client.get('/api/carrito/total?vendedor_id=7', headers=encabezados).get_json()
+    assert total == {"subtotal": 50.0, "descuentos": 0.0, "total": 50.0, "items": 1}
+
+    client.put('/api/productos/2', json={"precio": 80.0}, headers=encabezados)
+    assert client.get('/api/carrito/total?vendedor_id=7', headers=encabezados).get_json()['subtotal'] == 80.0
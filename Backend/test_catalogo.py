@@ -0,0 +1,63 @@
+import time
+from catalogo import CacheCatalogo
+
+
+def test_cache_expulsa_menos_usados():
+    """La cache no supera su tamaño máximo y expulsa el producto menos usado"""
+    cache = CacheCatalogo(ttl=60, max_productos=2)
+    cache.guardar({"id": 1, "nombre": "A"})
+    cache.guardar({"id": 2, "nombre": "B"})
+    cache.obtener(1)
+    cache.guardar({"id": 3, "nombre": "C"})
+    assert cache.obtener(2) is None
+    assert cache.obtener(1)[0]["nombre"] == "A"
+    assert cache.obtener(3)[0]["nombre"] == "C"
+
+
+def test_cache_expira_por_ttl():
+    """Los productos expiran al cumplirse el TTL"""
+    cache = CacheCatalogo(ttl=0.01, max_productos=10)
+    cache.guardar_listado([{"id": 1, "nombre": "A"}])
+    assert cache.listar() is not None
+    time.sleep(0.02)
+    assert cache.listar() is None
+    assert cache.obtener(1) is None
+
+
+def test_invalidar_descarta_listado():
+    """Escribir un producto invalida el listado completo pero conserva el ETag estable"""
+    cache = CacheCatalogo(ttl=60, max_productos=10)
+    etag = cache.guardar_listado([{"id": 1, "nombre": "A"}, {"id": 2, "nombre": "B"}])
+    assert cache.listar()[1] == etag
+    cache.invalidar(2)
+    assert cache.listar() is None
+    assert cache.obtener(1) is not None
+    assert cache.guardar_listado([{"id": 1, "nombre": "A"}, {"id": 2, "nombre": "B"}]) == etag
+
+
+def test_indice_por_codigo_sigue_escrituras():
+    """El índice de SKU/código de barras se actualiza al modificar o invalidar productos"""
+    cache = CacheCatalogo(ttl=60, max_productos=10)
+    cache.guardar({"id": 1, "sku": "PUDO1", "codigo_barras": "750100"})
+    assert cache.buscar_codigo("PUDO1")[0]["id"] == 1
+    assert cache.buscar_codigo("750100")[0]["id"] == 1
+    cache.guardar({"id": 1, "sku": "PUDO2", "codigo_barras": "750100"})
+    assert cache.buscar_codigo("PUDO1") is None
+    assert cache.buscar_codigo("PUDO2")[0]["id"] == 1
+    cache.invalidar(1)
+    assert cache.buscar_codigo("750100") is None
+
+
+def test_ids_como_texto_y_filas_reemplazadas():
+    """Los ids en texto apuntan a la misma entrada y una fila distinta descarta el listado"""
+    cache = CacheCatalogo(ttl=60, max_productos=10)
+    cache.guardar_listado([{"id": 1, "nombre": "A"}, {"id": 2, "nombre": "B"}])
+    assert cache.obtener("1")[0]["nombre"] == "A"
+    cache.guardar({"id": 1, "nombre": "A"})
+    assert cache.listar() is not None
+    cache.guardar({"id": 2, "nombre": "B2"})
+    assert cache.listar() is None
+
+    cache.guardar_listado([{"id": 1, "nombre": "A"}, {"id": 2, "nombre": "B2"}])
+    cache.invalidar("2")
+    assert cache.obtener(2) is None and cache.listar() is None
@@ -0,0 +1,43 @@
+import gzip
+import brotli
+import pytest
+
+
+@pytest.fixture
+def client(api):
+    historial = [{"id": i, "producto_id": i % 7, "stock_anterior": 10, "stock_nuevo": 9, "diferencia": -1,
+                  "fecha": f"2026-10-{1 + i % 28:02d}T10:00:00", "usuario": "sistema", "motivo": "Venta"} for i in range(1, 101)]
+    return api({'historial_inventario': historial})
+
+
+def test_historial_comprimido_y_304(client):
+    """El listado se comprime según Accept-Encoding y una ETag vigente devuelve 304 sin cuerpo"""
+    client, encabezados, _ = client
+    plano = client.get('/api/inventario/historial', headers=encabezados)
+    etag = plano.headers['ETag']
+    assert 'Content-Encoding' not in plano.headers
+
+    con_br = client.get('/api/inventario/historial', headers=dict(encabezados, **{'Accept-Encoding': 'gzip, br'}))
+    assert con_br.headers['Content-Encoding'] == 'br' and con_br.headers['ETag'] == etag[:-1] + '-br"'
+    assert brotli.decompress(con_br.data) == plano.data and len(con_br.data) < len(plano.data)
+    assert 'Accept-Encoding' in con_br.headers['Vary']
+
+    con_gzip = client.get('/api/inventario/historial', headers=dict(encabezados, **{'Accept-Encoding': 'gzip'}))
+    assert con_gzip.headers['Content-Encoding'] == 'gzip' and gzip.decompress(con_gzip.data) == plano.data
+
+    # La ETag de cualquier codificación sirve para revalidar
+    for vigente in (etag, con_br.headers['ETag']):
+        respuesta = client.get('/api/inventario/historial', headers=dict(encabezados, **{'If-None-Match': vigente}))
+        assert respuesta.status_code == 304 and respuesta.data == b''
+
+
+def test_etag_cambia_con_los_datos_y_minimo(client):
+    """Una fila nueva cambia la ETag; las respuestas chicas no se comprimen"""
+    client, encabezados, memoria = client
+    antes = client.get('/api/inventario/historial', headers=encabezados).headers['ETag']
+    memoria.tablas['historial_inventario'].append({"id": 101, "producto_id": 1, "fecha": "2026-10-30T10:00:00"})
+    respuesta = client.get('/api/inventario/historial', headers=dict(encabezados, **{'If-None-Match': antes}))
+    assert respuesta.status_code == 200 and respuesta.headers['ETag'] != antes
+
+    chica = client.get('/api/inventario/historial?limite=1', headers=dict(encabezados, **{'Accept-Encoding': 'gzip'}))
+    assert 'Content-Encoding' not in chica.headers
@@ -0,0 +1,89 @@
+import hashlib
+import threading
+import time
+import pytest
+import contrasenas
+from contrasenas import PoolContrasenas, ContrasenasSaturadas, verificar_local, hashear_local
+
+
+def test_hash_con_sal_y_verificacion():
+    """El mismo password produce hashes distintos y ambos se verifican sin pedir rehash"""
+    primero, segundo = hashear_local('secreta'), hashear_local('secreta')
+    assert primero != segundo and primero.startswith('scrypt$')
+    assert verificar_local('secreta', primero) == (True, None)
+    assert verificar_local('otra', primero) == (False, None)
+
+
+def test_sha256_anterior_se_rehashea():
+    """Un hash SHA-256 del formato anterior se acepta y devuelve su reemplazo"""
+    anterior = hashlib.sha256(b'secreta').hexdigest()
+    coincide, nuevo = verificar_local('secreta', anterior)
+    assert coincide and nuevo.startswith('scrypt$')
+    assert verificar_local('secreta', nuevo) == (True, None)
+    assert verificar_local('otra', anterior) == (False, None)
+
+
+def test_pbkdf2_con_algoritmo_nuevo(monkeypatch):
+    """Cambiar CONTRASENA_ALGORITMO migra los hashes existentes en el siguiente login"""
+    monkeypatch.setattr(contrasenas, 'CONTRASENA_ALGORITMO', 'pbkdf2_sha256')
+    monkeypatch.setattr(contrasenas, 'PBKDF2_ITERACIONES', 1000)
+    anterior = contrasenas._hash_scrypt('secreta')
+    coincide, nuevo = verificar_local('secreta', anterior)
+    assert coincide and nuevo.startswith('pbkdf2_sha256$1000$')
+
+
+def test_pool_rechaza_al_saturarse():
+    """Con la cola llena las verificaciones extra se rechazan tras el tiempo de espera"""
+    pool = PoolContrasenas(procesos=1, cola=1, espera=0.2)
+    errores = []
+
+    def lenta():
+        try:
+            pool._ejecutar(time.sleep, 1)
+        except ContrasenasSaturadas as e:
+            errores.append(e)
+
+    hilo = threading.Thread(target=lenta)
+    hilo.start()
+    time.sleep(0.05)
+    with pytest.raises(ContrasenasSaturadas):
+        pool._ejecutar(time.sleep, 0)
+    hilo.join()
+    assert pool.estadisticas()['rechazadas'] == 2
+
+
+def test_scrypt_migra_con_r_o_p_nuevos(monkeypatch):
+    """Cambiar r o p de scrypt (no solo n) marca el hash almacenado para reemplazo"""
+    anterior = hashear_local('secreta')
+    monkeypatch.setattr(contrasenas, 'SCRYPT_R', 4)
+    coincide, nuevo = verificar_local('secreta', anterior)
+    assert coincide and nuevo.split('$')[2] == '4'
+    monkeypatch.setattr(contrasenas, 'SCRYPT_R', 8)
+    monkeypatch.setattr(contrasenas, 'SCRYPT_P', 2)
+    assert verificar_local('secreta', anterior)[1].split('$')[3] == '2'
+
+
+def test_pool_se_recupera_de_un_proceso_muerto():
+    """Si un proceso del pool muere (BrokenProcessPool), el pool se reemplaza y la tarea se reintenta"""
+    import os
+    import signal
+    pool = PoolContrasenas(procesos=1, cola=2, espera=5)
+    assert pool.verificar('secreta', hashear_local('secreta')) == (True, None)
+    anterior = pool._pool
+    for proceso in list(anterior._processes.values()):
+        os.kill(proceso.pid, signal.SIGKILL)
+    time.sleep(0.2)
+    assert pool.verificar('secreta', hashear_local('secreta')) == (True, None)
+    assert pool._pool is not anterior
+    assert pool.estadisticas()['en_curso'] == 0
+
+
+def test_correo_no_registrado_tambien_calcula_el_kdf(api, monkeypatch):
+    """El login de un correo inexistente verifica contra un hash ficticio: mismo costo que uno real"""
+    import usuarios
+    llamadas = []
+    original = usuarios.pool_contrasenas._ejecutar
+    monkeypatch.setattr(usuarios.pool_contrasenas, '_ejecutar', lambda funcion, *args: llamadas.append(funcion) or original(funcion, *args))
+    client, _, _ = api({'usuarios': []})
+    respuesta = client.post('/api/auth/login', json={"correo": "nadie@karma.com", "password": "secreta"})
+    assert respuesta.status_code == 401 and llamadas == [verificar_local]
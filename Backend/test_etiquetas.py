@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+import textwrap
+import pytest
+import etiquetas
+
+
+class _PoolQueVacia:
+    # Mientras se renderiza, otra solicitud llena la cache y expulsa lo que había
+    def map(self, funcion, pendientes, chunksize=1):
+        etiquetas._cache.clear()
+        return [f"png-{e['sku']}".encode() for e in pendientes]
+
+
+def test_cache_expulsada_durante_el_render(monkeypatch):
+    """Las etiquetas encontradas en cache se devuelven aunque se expulsen antes de terminar"""
+    monkeypatch.setattr(etiquetas, '_cache', etiquetas.OrderedDict())
+    monkeypatch.setattr(etiquetas, '_obtener_pool', lambda: _PoolQueVacia())
+    a = {"sku": "ANRO1", "precio": 100}
+    b = {"sku": "ANRO2", "precio": 120}
+    etiquetas._cache[etiquetas._clave(a)] = b"png-cacheada"
+    assert etiquetas.renderizar_etiquetas([a, b, a]) == [b"png-cacheada", b"png-ANRO2", b"png-cacheada"]
+    assert list(etiquetas._cache) == [etiquetas._clave(b)]
+
+
+class _PoolEnProceso:
+    def map(self, funcion, pendientes, chunksize=1):
+        return [funcion(e) for e in pendientes]
+
+
+def test_sku_fuera_de_code128_se_omite(api, monkeypatch):
+    """Un SKU que Code128 no admite no tumba la hoja: se omite y se informa su producto"""
+    monkeypatch.setattr(etiquetas, '_cache', etiquetas.OrderedDict())
+    monkeypatch.setattr(etiquetas, '_obtener_pool', lambda: _PoolEnProceso())
+    client, encabezados, _ = api({'productos': [
+        {"id": 1, "nombre": "Anillo", "precio": 100, "stock": 1, "sku": "ANRO1", "color": "rojo"},
+        {"id": 2, "nombre": "Añillo", "precio": 100, "stock": 1, "sku": "AÑRO1", "color": "rojo"},
+        {"id": 3, "nombre": "玉", "precio": 100, "stock": 1, "sku": "玉1", "color": "verde"},
+    ]})
+    respuesta = client.get('/api/productos/etiquetas/hoja?formato=png', headers=encabezados)
+    assert respuesta.status_code == 200 and respuesta.headers['Content-Type'] == 'image/png'
+    assert respuesta.headers['X-Etiquetas-Omitidas'] == '2,3'
+
+    respuesta = client.get('/api/productos/etiquetas/hoja?ids=2,3', headers=encabezados)
+    assert respuesta.status_code == 422 and respuesta.get_json()['omitidas'] == [2, 3]
+
+
+def test_render_con_gevent():
+    """Con monkey.patch_all (workers gevent) el pool renderiza sin bloquear al resto de greenlets"""
+    pytest.importorskip('gevent')
+    guion = textwrap.dedent("""
+        from gevent import monkey
+        monkey.patch_all()
+        import gevent, time
+        import etiquetas
+        latidos = []
+        def latir():
+            while True:
+                latidos.append(time.monotonic())
+                gevent.sleep(0.01)
+        gevent.spawn(latir)
+        gevent.sleep(0.05)
+        lote = [{"sku": f"ANRO{i}", "barcode": f"ANRO{i}", "qr_code": f"ANRO{i}|{i}", "nombre": "Anillo",
+                 "precio": 100, "color": "rojo"} for i in range(48)]
+        inicio = time.monotonic()
+        imagenes = etiquetas.renderizar_etiquetas(lote)
+        fin = time.monotonic()
+        durante = [t for t in latidos if inicio <= t <= fin]
+        print(len(imagenes), all(imagenes), len(durante), fin - inicio)
+    """)
+    salida = subprocess.run([sys.executable, '-c', guion], capture_output=True, text=True, timeout=120,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=dict(os.environ, ETIQUETAS_PROCESOS='2'))
+    assert salida.returncode == 0, salida.stderr
+    total, completas, durante, segundos = salida.stdout.split()
+    assert total == '48' and completas == 'True'
+    # El latido de 10 ms siguió corriendo mientras se esperaba al pool
+    assert int(durante) >= float(segundos) / 0.01 / 4
@@ -0,0 +1,116 @@
+import json
+import pytest
+import exportar
+from flask import Flask
+
+
+class _ConsultaFalsa:
+    def __init__(self, filas, consultas, max_filas):
+        self.filas = filas
+        self.consultas = consultas
+        self.max_filas = max_filas
+        self.desde_id = None
+        self.limite = None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def gt(self, campo, valor):
+        self.desde_id = valor
+        return self
+
+    def order(self, campo):
+        return self
+
+    def limit(self, limite):
+        self.limite = limite
+        return self
+
+    def execute(self):
+        self.consultas.append(self.desde_id)
+        filas = [f for f in self.filas if self.desde_id is None or f['id'] > self.desde_id]
+
+        class Resultado:
+            data = filas[:min(self.limite, self.max_filas)]
+        return Resultado()
+
+
+class _ClienteFalso:
+    # max_filas imita el max-rows de PostgREST: recorta la respuesta aunque el límite sea mayor
+    def __init__(self, filas, max_filas=1000):
+        self.filas = filas
+        self.max_filas = max_filas
+        self.consultas = []
+
+    def table(self, nombre):
+        return _ConsultaFalsa(self.filas, self.consultas, self.max_filas)
+
+
+def _exportar(monkeypatch, formato, filas, bloque=2, max_filas=1000):
+    cliente = _ClienteFalso(filas, max_filas)
+    monkeypatch.setattr(exportar, 'supabase', cliente)
+    monkeypatch.setattr(exportar, 'EXPORTAR_BLOQUE', bloque)
+    app = Flask(__name__)
+    with app.test_request_context(f'/?formato={formato}'):
+        respuesta = exportar.respuesta_exportacion('ventas')
+        cuerpo = respuesta.get_data(as_text=True) if not isinstance(respuesta, tuple) else ''
+    return respuesta, cuerpo, cliente.consultas
+
+
+def test_exportar_ndjson_por_bloques(monkeypatch):
+    """La exportación recorre la tabla por bloques de id y escribe una línea por fila"""
+    filas = [{"id": i, "total": i * 10} for i in range(1, 6)]
+    respuesta, cuerpo, consultas = _exportar(monkeypatch, 'ndjson', filas)
+    assert respuesta.mimetype == 'application/x-ndjson'
+    assert [json.loads(linea) for linea in cuerpo.splitlines()] == filas
+    assert consultas == [None, 2, 4, 5]
+
+
+def test_exportar_con_max_rows_menor_al_bloque(monkeypatch):
+    """Si el servidor devuelve menos filas que el bloque, la exportación sigue hasta un bloque vacío"""
+    filas = [{"id": i} for i in range(1, 8)]
+    _, cuerpo, consultas = _exportar(monkeypatch, 'ndjson', filas, bloque=5, max_filas=3)
+    assert [json.loads(linea) for linea in cuerpo.splitlines()] == filas
+    assert consultas == [None, 3, 6, 7]
+
+
+def test_exportar_csv_con_encabezado(monkeypatch):
+    """El CSV usa las columnas de la primera fila y serializa los objetos anidados como JSON"""
+    filas = [{"id": 1, "estado": "completada", "extra": {"a": 1}}, {"id": 2, "estado": None, "extra": None}]
+    respuesta, cuerpo, _ = _exportar(monkeypatch, 'csv', filas)
+    lineas = cuerpo.splitlines()
+    assert lineas[0] == 'id,estado,extra'
+    assert lineas[1] == '1,completada,"{""a"": 1}"'
+    assert lineas[2] == '2,,'
+    assert 'attachment; filename="ventas.csv"' == respuesta.headers['Content-Disposition']
+
+
+def test_exportar_formato_invalido(monkeypatch):
+    """Un formato desconocido responde 400 sin consultar la base de datos"""
+    respuesta, _, consultas = _exportar(monkeypatch, 'xml', [{"id": 1}])
+    assert respuesta[1] == 400
+    assert consultas == []
+
+
+def test_exportar_error_antes_de_responder(monkeypatch):
+    """Un error en la primera consulta se propaga antes de enviar el 200 con el archivo"""
+    cliente = _ClienteFalso([{"id": 1}])
+
+    def falla():
+        raise RuntimeError("filtro inválido")
+    monkeypatch.setattr(exportar, 'supabase', cliente)
+    monkeypatch.setattr(_ConsultaFalsa, 'execute', lambda self: falla())
+    with Flask(__name__).test_request_context('/?formato=csv'):
+        with pytest.raises(RuntimeError, match="filtro inválido"):
+            exportar.respuesta_exportacion('ventas')
+
+
+def test_exportar_ventas_sin_filtro_estado(api):
+    """ventas no tiene columna estado: el filtro se rechaza y un error de Supabase responde JSON"""
+    client, encabezados, _ = api({'ventas': [{"id": 1, "fecha": "2026-10-17T12:00:00", "total": 300.0}]})
+    assert client.get('/api/ventas/exportar?estado=pagado', headers=encabezados).status_code == 400
+    assert json.loads(client.get('/api/ventas/exportar?formato=ndjson', headers=encabezados).get_data(as_text=True))['id'] == 1
+
+    client, encabezados, _ = api({})
+    respuesta = client.get('/api/ventas/exportar', headers=encabezados)
+    assert respuesta.status_code == 500 and 'error' in respuesta.get_json()
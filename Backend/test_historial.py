@@ -0,0 +1,79 @@
+import sqlite3
+import historial
+from historial import EscritorHistorial
+from postgrest.exceptions import APIError
+
+
+class _ClienteFalso:
+    def __init__(self):
+        self.lotes = []
+        self.error = None
+
+    def table(self, nombre):
+        cliente = self
+
+        class Insert:
+            def insert(self, filas):
+                self.filas = filas if isinstance(filas, list) else [filas]
+                return self
+
+            def execute(self):
+                if cliente.error:
+                    raise cliente.error
+                cliente.lotes.append(self.filas)
+        return Insert()
+
+
+def _escritor(monkeypatch, tmp_path, **opciones):
+    cliente = _ClienteFalso()
+    monkeypatch.setattr(historial, 'supabase', cliente)
+    escritor = EscritorHistorial(ruta_spool=str(tmp_path / 'spool.sqlite3'), **opciones)
+    return escritor, cliente
+
+
+def test_escribe_en_lotes(monkeypatch, tmp_path):
+    """Las filas se insertan en segundo plano en lotes de tamaño máximo"""
+    escritor, cliente = _escritor(monkeypatch, tmp_path, lote=3, intervalo=0.05)
+    escritor.registrar([{"producto_id": i} for i in range(7)])
+    escritor.vaciar()
+    assert sorted(f["producto_id"] for lote in cliente.lotes for f in lote) == list(range(7))
+    assert max(len(lote) for lote in cliente.lotes) <= 3
+
+
+def test_spool_y_reenvio(monkeypatch, tmp_path):
+    """Si Supabase no responde las filas quedan en el spool y se reenvían después"""
+    escritor, cliente = _escritor(monkeypatch, tmp_path, lote=10, intervalo=0.05)
+    cliente.error = ConnectionError("sin conexión")
+    escritor.registrar([{"producto_id": 1}, {"producto_id": 2}])
+    escritor.vaciar()
+    assert cliente.lotes == []
+
+    cliente.error = None
+    assert escritor.reenviar_spool() == 2
+    assert cliente.lotes == [[{"producto_id": 1}, {"producto_id": 2}]]
+    assert escritor.reenviar_spool() == 0
+
+
+def test_filas_rechazadas_se_apartan(monkeypatch, tmp_path):
+    """Las filas que Supabase rechaza al reenviar se apartan sin bloquear el resto"""
+    escritor, cliente = _escritor(monkeypatch, tmp_path, lote=10, intervalo=0.05)
+    cliente.error = ConnectionError("sin conexión")
+    escritor.registrar([{"producto_id": 1}])
+    escritor.vaciar()
+
+    cliente.error = APIError({"code": "23502", "message": "null value"})
+    assert escritor.reenviar_spool() == 0
+    conexion = sqlite3.connect(escritor.ruta_spool)
+    assert conexion.execute('SELECT COUNT(*) FROM pendientes').fetchone()[0] == 0
+    assert conexion.execute('SELECT COUNT(*) FROM descartadas').fetchone()[0] == 1
+
+
+def test_solo_rechazos_definitivos_se_apartan():
+    """Datos inválidos o solicitudes rechazadas se apartan; fallas sin código o de conexión se reintentan"""
+    assert historial._es_rechazo(APIError({"code": "23505", "message": "duplicate key"}))
+    assert historial._es_rechazo(APIError({"code": "22P02", "message": "invalid input syntax"}))
+    assert historial._es_rechazo(APIError({"code": "PGRST102", "message": "Empty or invalid json"}))
+    assert not historial._es_rechazo(APIError({"message": "An invalid response was received from the upstream server"}))
+    assert not historial._es_rechazo(APIError({"code": "PGRST000", "message": "connection refused"}))
+    assert not historial._es_rechazo(APIError({"code": "57014", "message": "statement timeout"}))
+    assert not historial._es_rechazo(ConnectionError("sin conexión"))
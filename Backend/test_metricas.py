@@ -0,0 +1,40 @@
+import json
+from flask import Flask, jsonify
+import db
+import metricas
+from metricas import Metricas
+
+
+def _app(monkeypatch, tmp_path):
+    monkeypatch.setattr(metricas, 'metricas', Metricas(directorio=str(tmp_path), intervalo=3600))
+    app = Flask(__name__)
+    metricas.configurar(app)
+
+    @app.route('/api/ventas')
+    def listar():
+        # Dos llamadas "a Supabase" en paralelo: ambas se atribuyen a esta solicitud
+        db.en_paralelo(lambda: db.registrar_llamada('ventas', 100, 0.01), lambda: db.registrar_llamada('pagos', 50, 0.02))
+        return jsonify([])
+    return app.test_client()
+
+
+def test_llamadas_por_endpoint(monkeypatch, tmp_path):
+    """Cada solicitud suma sus llamadas, bytes y tiempo upstream a su endpoint"""
+    client = _app(monkeypatch, tmp_path)
+    client.get('/api/ventas')
+    client.get('/api/ventas')
+    texto = client.get('/metrics').get_data(as_text=True)
+    assert 'karma_http_solicitud_segundos_count{endpoint="listar",metodo="GET",estado="200"} 2' in texto
+    assert 'karma_supabase_solicitud_llamadas_total{endpoint="listar"} 4' in texto
+    assert 'karma_supabase_solicitud_bytes_total{endpoint="listar"} 300' in texto
+    assert 'endpoint="metricas"' not in texto
+
+
+def test_suma_otros_workers(monkeypatch, tmp_path):
+    """Las instantáneas de otros procesos se suman a los contadores propios"""
+    client = _app(monkeypatch, tmp_path)
+    client.get('/api/ventas')
+    otro = metricas.metricas.instantanea()
+    (tmp_path / '999999.json').write_text(json.dumps(otro))
+    texto = client.get('/metrics').get_data(as_text=True)
+    assert 'karma_http_solicitud_segundos_count{endpoint="listar",metodo="GET",estado="200"} 2' in texto
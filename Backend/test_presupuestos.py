@@ -0,0 +1,100 @@
+import collections
+import flask
+import pytest
+from app import app
+from contrasenas import hashear_local
+from postgrest_memoria import ajustar_stock
+
+# Tamaño del ticket con el que se compara contra el de un item para detectar llamadas por item
+TICKET = 10
+
+
+def _items(n):
+    return [{"producto_id": i, "cantidad": 1, "precio": 100.0} for i in range(1, n + 1)]
+
+
+# (método, ruta, cuerpo para un ticket de n items, llamadas fijas, llamadas por item permitidas)
+# Medido sin las RPC instaladas, el peor caso (salvo ajustar_stock, sin la cual las ventas con inventario
+# fallan): con los .sql de Backend/ cada escritura es una sola llamada
+PRESUPUESTOS = [
+    ('POST', '/api/auth/login', lambda n: {"correo": "ana@karma.com", "password": "secreta"}, 1, 0),
+    ('GET', '/api/auth/profile', None, 0, 0),
+    ('GET', '/api/productos', None, 1, 0),
+    ('GET', '/api/productos/3', None, 1, 0),
+    ('GET', '/api/inventario', None, 2, 0),
+    ('GET', '/api/inventario/3', None, 2, 0),
+    ('GET', '/api/inventario/historial', None, 1, 0),
+    ('GET', '/api/carrito', None, 2, 0),
+    ('GET', '/api/carrito/total', None, 2, 0),
+    ('POST', '/api/carrito', lambda n: {"producto_id": 2, "cantidad": 1, "vendedor_id": 1}, 3, 0),
+    ('GET', '/api/ventas', None, 3, 0),
+    ('GET', '/api/ventas/1', None, 2, 0),
+    # Con ajustar_stock (db_ajustar_stock.sql): una consulta y un UPDATE para todo el ajuste
+    ('POST', '/api/inventario/ajuste', lambda n: [{"producto_id": i, "cantidad": 1} for i in range(1, n + 1)], 2, 0),
+    # Sin registrar_venta (db_registrar_venta.sql): el stock de todo el ticket baja con un ajustar_stock
+    ('POST', '/api/ventas', lambda n: {"items": _items(n), "actualizar_inventario": True, "vaciar_carrito": True}, 6, 0),
+    # Sin agregar_carrito (db_carrito_agregar.sql): producto, línea e insert/update por escaneo
+    ('POST', '/api/carrito/lote', lambda n: {"vendedor_id": 1, "items": [{"producto_id": i} for i in range(1, n + 1)]}, 0, 3),
+]
+
+
+@pytest.fixture
+def medir(api):
+    client, encabezados, _ = api({
+        'productos': [{"id": i, "nombre": f"Anillo {i}", "precio": 100.0 + i, "stock": 1000, "sku": f"ANRO{i:04d}",
+                       "codigo_barras": f"75{i:010d}", "categoria": "anillos", "descuento": 0} for i in range(1, 51)],
+        'usuarios': [{"id": 1, "nombre": "Ana", "correo": "ana@karma.com", "role": "admin",
+                      "contraseña": hashear_local("secreta")}],
+        'ventas': [{"id": 1, "fecha": "2026-10-17T12:00:00", "total": 300.0, "usuario_id": 1}],
+        'pagos': [{"id": 1, "venta_id": 1, "metodo_pago": "efectivo", "monto": 300.0, "fecha": "2026-10-17T12:00:00"}],
+        'detalles_venta': [], 'carrito': [], 'historial_inventario': [],
+    }, rpcs={'ajustar_stock': ajustar_stock})
+    registros = []
+
+    def terminada(sender, response, **extra):
+        registros.append(flask.g.get('metricas_llamadas'))
+    flask.request_finished.connect(terminada, app)
+
+    def solicitud(metodo, ruta, cuerpo=None):
+        respuesta = client.open(ruta, method=metodo, json=cuerpo, headers=encabezados)
+        assert respuesta.status_code < 400, (metodo, ruta, respuesta.get_json())
+        return registros[-1]["detalle"]
+
+    try:
+        yield solicitud
+    finally:
+        flask.request_finished.disconnect(terminada, app)
+
+
+def _por_item(pequeno, grande):
+    # Firmas (método, tabla) que crecen con el tamaño del ticket: consultas dentro de un bucle
+    crecen = collections.Counter(grande) - collections.Counter(pequeno)
+    return {firma: veces / (TICKET - 1) for firma, veces in crecen.items()}
+
+
+def test_presupuesto_de_llamadas(medir):
+    """Cada ruta respeta su presupuesto de llamadas a Supabase y solo las declaradas crecen por item"""
+    excedidas = []
+    reporte = []
+    for metodo, ruta, cuerpo, fijas, por_item in PRESUPUESTOS:
+        cuerpo = cuerpo or (lambda n: None)
+        # La primera solicitud descubre qué RPC faltan y llena caches; se mide el estado estable
+        medir(metodo, ruta, cuerpo(1))
+        pequeno = medir(metodo, ruta, cuerpo(1))
+        grande = medir(metodo, ruta, cuerpo(TICKET))
+        crecen = _por_item(pequeno, grande)
+        if crecen:
+            reporte.append(f"{metodo} {ruta}: " + ', '.join(f"{m} {t} x{v:g}/item" for (m, t), v in crecen.items()))
+        for n, detalle in ((1, pequeno), (TICKET, grande)):
+            if len(detalle) > fijas + por_item * n:
+                excedidas.append(f"{metodo} {ruta} (n={n}): {len(detalle)} llamadas > {fijas + por_item * n} {detalle}")
+    print("\nConsultas por item (N+1):\n  " + "\n  ".join(reporte))
+    assert not excedidas, "\n".join(excedidas)
+
+
+def test_detecta_consultas_por_item():
+    """Una consulta repetida por cada item aparece como N+1 con su firma"""
+    pequeno = [('GET', 'productos'), ('PATCH', 'productos')]
+    grande = [('GET', 'productos')] + [('PATCH', 'productos')] * TICKET
+    assert _por_item(pequeno, grande) == {('PATCH', 'productos'): 1}
+    assert _por_item(pequeno, pequeno) == {}
@@ -0,0 +1,32 @@
+import json
+import logging
+import queue
+import registro
+from registro import FormatoJSON, _ManejadorCola, _Muestreo
+
+
+def _registro(nivel, mensaje, *args, nombre='ventas', **extra):
+    record = logging.LogRecord(nombre, nivel, __file__, 1, mensaje, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_con_argumentos_acotados(monkeypatch):
+    """Los argumentos grandes se truncan antes de encolar y el registro sale como una línea JSON"""
+    monkeypatch.setattr(registro, 'LOG_MAX_CARACTERES', 50)
+    manejador = _ManejadorCola(queue.SimpleQueue())
+    payload = {"items": [{"producto_id": i, "cantidad": 1} for i in range(200)]}
+    preparado = manejador.prepare(_registro(logging.DEBUG, "Datos recibidos: %s", payload, venta_id=9))
+
+    linea = json.loads(FormatoJSON().format(preparado))
+    assert linea['nivel'] == 'DEBUG' and linea['modulo'] == 'ventas' and linea['venta_id'] == 9
+    assert linea['mensaje'].startswith("Datos recibidos: {'items'")
+    assert len(linea['mensaje']) <= 53
+
+
+def test_muestreo_no_descarta_errores():
+    """El muestreo solo aplica a DEBUG/INFO del módulo configurado"""
+    muestreo = _Muestreo({'ventas': 0})
+    assert not muestreo.filter(_registro(logging.INFO, "Venta"))
+    assert muestreo.filter(_registro(logging.ERROR, "Error"))
+    assert muestreo.filter(_registro(logging.INFO, "Pago", nombre='pagos'))
@@ -0,0 +1,37 @@
+import datetime
+import decimal
+import json
+import pytest
+import flask
+from flask import Flask, jsonify
+from serializacion import PROVEEDORES, configurar
+
+
+@pytest.fixture(params=sorted(PROVEEDORES))
+def app(request):
+    app = Flask(__name__)
+    configurar(app, request.param)
+
+    @app.route('/eco', methods=['POST'])
+    def eco():
+        datos = flask.request.get_json()
+        return jsonify(recibido=datos, monto=decimal.Decimal('1234567.89'), centavos=decimal.Decimal('0.10'), fecha=datetime.datetime(2026, 10, 18, 12, 30),
+                       dia=datetime.date(2026, 10, 18), metodos={1: 10.5})
+    return app
+
+
+def test_decimal_fechas_y_get_json(app):
+    """Decimal sale como texto exacto, fechas en ISO 8601 y el cuerpo de la solicitud se lee con el mismo proveedor"""
+    respuesta = app.test_client().post('/eco', data='{"items": [{"producto_id": 1, "precio": 99.9}]}',
+                                       content_type='application/json')
+    datos = json.loads(respuesta.data)
+    assert datos['monto'] == '1234567.89' and datos['centavos'] == '0.10'
+    assert datos['fecha'] == '2026-10-18T12:30:00' and datos['dia'] == '2026-10-18'
+    assert datos['recibido'] == {"items": [{"producto_id": 1, "precio": 99.9}]}
+    assert datos['metodos'] == {"1": 10.5}
+
+
+def test_json_invalido_es_400(app):
+    """Un cuerpo mal formado responde 400 como con el módulo estándar"""
+    respuesta = app.test_client().post('/eco', data='{"items": [', content_type='application/json')
+    assert respuesta.status_code == 400